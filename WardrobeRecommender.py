@@ -1,15 +1,58 @@
-from datasets import load_dataset
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import torch
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Iterator
+import os
 import random
-from dataclasses import dataclass
-from PIL import Image
-import io
+import sys
+from dataclasses import dataclass, fields
 import base64
+import copy
+import zlib
+import itertools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import time
+from catalog import Catalog, ItemView
+from bitmap_index import BitmapIndex
+from image_cache import ThumbnailCache, make_thumbnail
+from embeddings import build_item_embeddings, profile_vector, top_k, top_k_batch
+from composer import OUTFIT_CATEGORIES, CategoryCandidates, compose_outfits, random_scores
+from result_cache import RecommendationCache
+from instrumentation import metrics
+from catalog_updates import CatalogDelta, apply_delta
+from sharding import ShardedFilter
+from price_index import PriceIndex, best_subset as best_subset_indices
+from budget_frontier import FrontierStore, build_frontiers, catalog_fingerprint
+from reservoir import WeightedReservoir
+from compatibility import OutfitCompatibility, compatibility_path
+from color_harmony import ColorHarmony, DEFAULT_WEIGHT as DEFAULT_HARMONY_WEIGHT
 
-@dataclass
+# torch is only referenced in annotations; datasets is imported when the
+# Polyvore dataset is actually loaded, so sample-data mode never imports either
+if TYPE_CHECKING:
+    import torch
+
+# No single catalog item may take more than this share of the outfit budget
+ITEM_BUDGET_SHARE = 0.4
+
+CATEGORIES = {
+    'tops': ['shirt', 'blouse', 't-shirt', 'sweater', 'jacket'],
+    'bottoms': ['pants', 'jeans', 'skirt', 'shorts'],
+    'dresses': ['dress', 'gown', 'jumpsuit'],
+    'shoes': ['sneakers', 'heels', 'boots', 'flats'],
+    'accessories': ['bag', 'jewelry', 'belt', 'scarf']
+}
+OCCASION_STYLES = {
+    'Wedding': ['Formal', 'Elegant', 'Classic'],
+    'Business Meeting': ['Professional', 'Formal', 'Conservative'],
+    'Casual Outing': ['Casual', 'Comfortable', 'Streetwear'],
+    'Party': ['Trendy', 'Stylish', 'Bold'],
+    'Date Night': ['Elegant', 'Romantic', 'Stylish']
+}
+
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10
+@dataclass(**({'slots': True} if sys.version_info >= (3, 10) else {}))
 class FashionItem:
     id: str
     name: str
@@ -22,31 +65,99 @@ class FashionItem:
     description: str
     image_data: str = None  # Base64 encoded image data
 
+    @classmethod
+    def from_view(cls, view: ItemView) -> 'FashionItem':
+        """Copy a catalog item view into a standalone FashionItem"""
+        return cls(**{field.name: getattr(view, field.name) for field in fields(cls)})
+
 class WardrobeRecommender:
-    def __init__(self):
+    def __init__(self, sample_data: bool = None, streaming: bool = None):
+        """Load the Polyvore dataset, or serve only the built-in samples when sample_data is set
+
+        With streaming set the dataset is opened as a stream and no catalog is
+        built; every request makes one bounded-memory pass over its rows.
+        sample_data and streaming default to the WARDROBE_SAMPLE_DATA and
+        WARDROBE_STREAMING environment variables.
+        """
+        if sample_data is None:
+            sample_data = bool(os.environ.get('WARDROBE_SAMPLE_DATA'))
+        if streaming is None:
+            streaming = bool(os.environ.get('WARDROBE_STREAMING'))
+        self._configure()
+        if not sample_data:
+            self.load_dataset(streaming=streaming)
+
+    @classmethod
+    def from_snapshot(cls, path: str, verify: bool = False) -> 'WardrobeRecommender':
+        """Create a recommender from a memory-mapped catalog snapshot without loading the dataset"""
+        from snapshot import read_snapshot
+        recommender = cls.from_catalog(*read_snapshot(path, verify=verify))
+        if os.path.exists(compatibility_path(path)):
+            recommender.load_compatibility(compatibility_path(path))
+        return recommender
+
+    @classmethod
+    def from_catalog(cls, catalog: Catalog, index: BitmapIndex = None) -> 'WardrobeRecommender':
+        """Create a recommender serving an already-built catalog"""
+        recommender = cls.__new__(cls)
+        recommender._configure()
+        recommender.catalog = catalog
+        recommender.index = index if index is not None else BitmapIndex.from_catalog(catalog)
+        return recommender
+
+    def _configure(self):
+        """Set up recommender state that does not depend on the catalog"""
+        self.catalog_version = next(_catalog_versions)
+        self.metrics = metrics
         self.dataset = None
+        self.catalog = None
+        self.index = None
+        self._price_index = None
+        # Precomputed budget frontiers for requests without a style profile
+        self.frontiers = None
+        # Outfit co-occurrence compatibility and its key for every catalog position
+        self.compatibility = None
+        self._catalog_keys = None
+        # Weight of outfit color harmony in composition; 0 turns it off
+        self.harmony_weight = DEFAULT_HARMONY_WEIGHT
+        self._color_harmony = None
+        self._row_harmony = None
         self.item_embeddings = None
-        self.categories = {
-            'tops': ['shirt', 'blouse', 't-shirt', 'sweater', 'jacket'],
-            'bottoms': ['pants', 'jeans', 'skirt', 'shorts'],
-            'dresses': ['dress', 'gown', 'jumpsuit'],
-            'shoes': ['sneakers', 'heels', 'boots', 'flats'],
-            'accessories': ['bag', 'jewelry', 'belt', 'scarf']
-        }
-        self.occasion_styles = {
-            'Wedding': ['Formal', 'Elegant', 'Classic'],
-            'Business Meeting': ['Professional', 'Formal', 'Conservative'],
-            'Casual Outing': ['Casual', 'Comfortable', 'Streetwear'],
-            'Party': ['Trendy', 'Stylish', 'Bold'],
-            'Date Night': ['Elegant', 'Romantic', 'Stylish']
-        }
-        self.load_dataset()
+        self._embeddings_lock = threading.Lock()
+        # Id map and embedding buffer carried across incremental catalog updates
+        self._lineage = None
+        # Processes used for sharded candidate filtering; 0 filters through the bitmap index
+        self.filter_workers = int(os.environ.get('WARDROBE_FILTER_WORKERS') or 0)
+        self._filter_executor = None
+        # Only the owner of the pool shuts it down; older catalog versions share it
+        self._owns_filter_executor = False
+        self._sharded_filter = None
+        self._sharded_lock = threading.Lock()
+        self.thumbnail_size = (256, 256)
+        self.thumbnail_cache = ThumbnailCache(max_bytes=64 * 1024 * 1024)
+        self.composer_beam = 64
+        self.result_cache = RecommendationCache()
+        # Candidates kept per category in a cache entry for per-session recomposition
+        self.cache_pool_size = 512
+        # Candidates sampled per category by the streaming dataset path
+        self.reservoir_size = 256
+        self.categories = {name: list(kinds) for name, kinds in CATEGORIES.items()}
+        self.occasion_styles = {name: list(styles) for name, styles in OCCASION_STYLES.items()}
+        self._initialize_sample_data()
     
-    def load_dataset(self):
-        """Load and prepare the Polyvore dataset"""
+    def load_dataset(self, streaming: bool = False):
+        """Load and prepare the Polyvore dataset, or open it as a stream without a catalog"""
         try:
-            # Try to load the dataset with the correct split name
-            self.dataset = load_dataset("Marqo/polyvore", split='data')
+            with self.metrics.stage('load_dataset'):
+                from datasets import load_dataset
+                if streaming:
+                    self.dataset = load_dataset("Marqo/polyvore", split='data', streaming=True)
+                    print("Streaming dataset rows for recommendations")
+                    return
+                # Try to load the dataset with the correct split name
+                self.dataset = load_dataset("Marqo/polyvore", split='data')
+                self.catalog = Catalog.from_dataset(self.dataset)
+                self.index = BitmapIndex.from_catalog(self.catalog)
             print(f"Successfully loaded dataset with {len(self.dataset)} items")
         except Exception as e:
             print(f"Warning: Could not load dataset: {str(e)}")
@@ -162,35 +273,668 @@ class WardrobeRecommender:
                 )
             ]
         }
+        self.set_sample_items(self.sample_items)
+
+    def set_sample_items(self, sample_items: Dict[str, List[FashionItem]]):
+        """Replace the sample items served when no catalog is available and re-index them
+
+        Items may be FashionItems or catalog ItemViews.
+        """
+        self.sample_items = sample_items
+        self._sample_list = [item for items in sample_items.values() for item in items]
+        self.sample_catalog = Catalog.from_rows(
+            {field.name: getattr(item, field.name) for field in fields(FashionItem)}
+            for item in self._sample_list
+        )
+        self.sample_index = BitmapIndex.from_catalog(self.sample_catalog)
     
     def get_outfit_recommendations(
         self,
-        style_profile: torch.Tensor,
+        style_profile: 'torch.Tensor',
         occasion: str,
         budget: float,
         preferences: Dict[str, Any],
-        num_recommendations: int = 3
+        num_recommendations: int = 3,
+        session_seed: Any = None
     ) -> List[Dict[str, Any]]:
-        """Generate outfit recommendations"""
+        """Generate outfit recommendations
+
+        Catalog results are cached per normalized request. By default a cache
+        hit returns the cached outfits; with a session_seed the cached
+        candidate pool is recomposed so each session sees its own stable set.
+        """
+        with self.metrics.stage('recommend'):
+            recommendations = list(self.iter_outfit_recommendations(
+                style_profile, occasion, budget, preferences, num_recommendations, session_seed
+            ))
+        self.metrics.observe('outfits_per_request', len(recommendations))
+        return recommendations
+
+    def iter_outfit_recommendations(
+        self,
+        style_profile: 'torch.Tensor',
+        occasion: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        num_recommendations: int = 3,
+        session_seed: Any = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield outfit recommendations one at a time as soon as each is ready
+
+        Takes the same arguments as get_outfit_recommendations. All outfits
+        are composed up front, which is cheap, but rows and thumbnails are
+        materialized one outfit per step, so the first look can be shown
+        before the rest are built.
+        """
+        self.metrics.count('requests')
+        yielded = 0
         try:
-            # Always use sample data for now since we're having issues with the dataset
-            return self._get_recommendations_from_samples(
+            # Serve from the catalog when one is loaded (dataset or snapshot), or
+            # from the streamed dataset rows, and it yields outfits; otherwise
+            # use the sample data
+            if self.catalog is not None:
+                for outfit in self._iter_cached_recommendations(
+                    style_profile, occasion, budget, preferences, num_recommendations, session_seed
+                ):
+                    yielded += 1
+                    yield outfit
+                if yielded:
+                    return
+            elif self.dataset is not None:
+                # Streaming mode: one pass over the dataset rows per request
+                for outfit in self._get_recommendations_from_dataset_stream(
+                    style_profile, occasion, budget, preferences, num_recommendations
+                ):
+                    yielded += 1
+                    yield outfit
+                if yielded:
+                    return
+            self.metrics.count('sample_fallbacks')
+            for outfit in self._get_recommendations_from_samples(
                 occasion, budget, preferences, num_recommendations
-            )
+            ):
+                yielded += 1
+                yield outfit
         except Exception as e:
             print(f"Error generating recommendations: {str(e)}")
             print("Falling back to default recommendations...")
-            return self._get_fallback_recommendations(budget, num_recommendations)
+            self.metrics.count('errors', stage='recommend')
+            yield from self._get_fallback_recommendations(budget, num_recommendations - yielded)
     
     def _get_recommendations_from_dataset(
         self,
-        style_profile: torch.Tensor,
+        style_profile: 'torch.Tensor',
+        occasion: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        num_recommendations: int,
+        vectorized: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Generate recommendations using the Polyvore dataset
+
+        Selects candidates through the bitmap index and applies the price cap
+        to the matches only; pass vectorized=False to run the original per-row
+        scan for comparison.
+        """
+        if not vectorized or self.catalog is None:
+            return self._get_recommendations_from_dataset_rows(
+                style_profile, occasion, budget, preferences, num_recommendations
+            )
+
+        if not self._budget_feasible(budget):
+            return []
+        query = None if style_profile is None else profile_vector(style_profile)
+        groups = self._candidate_groups(query, occasion, budget, preferences)
+        return self._compose_scored(groups, budget, num_recommendations)
+
+    def _iter_cached_recommendations(
+        self,
+        style_profile: 'torch.Tensor',
+        occasion: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        num_recommendations: int,
+        session_seed: Any = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Serve catalog recommendations through the result cache
+
+        Misses are computed for the request's exact budget. The entry keeps a
+        pool of the best-scoring and cheapest candidates per category, a
+        superset of what the composer keeps, so composing from the pool
+        matches composing from all candidates.
+        """
+        if not self._budget_feasible(budget):
+            return
+        if style_profile is None and session_seed is None and self.frontiers is not None:
+            outfits = self._frontier_outfits(occasion, budget, preferences, num_recommendations)
+            if outfits is not None:
+                for positions, _, _ in outfits:
+                    yield self._outfit_from_positions(list(positions))
+                return
+        query = None if style_profile is None else profile_vector(style_profile)
+        key = self.result_cache.make_key(occasion, budget, preferences, num_recommendations, query)
+        catalog_version = self.catalog_version
+
+        entry = self.result_cache.get(key, catalog_version)
+        self.metrics.count('result_cache_misses' if entry is None else 'result_cache_hits')
+        if entry is None:
+            groups = self._candidate_groups(query, occasion, budget, preferences)
+            pool = [group.prune(self.cache_pool_size) for group in groups]
+            entry = self.result_cache.put(key, catalog_version, pool, None)
+
+        if session_seed is None:
+            if entry.outfits is None:
+                entry.outfits = self._compose_positions(entry.groups, budget, num_recommendations)
+            # Only catalog positions are cached; outfits and their thumbnails are
+            # built per request, the thumbnails through the byte-bounded cache
+            for positions in entry.outfits:
+                yield self._outfit_from_positions(positions)
+            return
+
+        # Recompose the cached pool with scores reshuffled by a per-session seed
+        rng = np.random.default_rng(zlib.crc32(repr((session_seed, key)).encode('utf-8')))
+        groups = []
+        for group in entry.groups:
+            if query is None:
+                scores = random_scores(len(group), rng)
+            else:
+                scores = group.scores + rng.normal(0, 0.02, len(group))
+            groups.append(CategoryCandidates(group.ids, group.prices, scores, group.keys, group.colors))
+        yield from self._iter_composed(groups, budget, num_recommendations)
+
+    def _frontier_outfits(
+        self,
+        occasion: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        num_recommendations: int
+    ) -> List[tuple]:
+        """Outfits answered from a precomputed budget frontier, or None to compose live"""
+        frontier = self.frontiers.get(self._preference_signature(occasion, preferences))
+        outfits = None if frontier is None else frontier.outfits(budget, num_recommendations, ITEM_BUDGET_SHARE)
+        self.metrics.count('frontier_misses' if outfits is None else 'frontier_hits')
+        return outfits
+
+    def precompute_frontiers(self, signatures: List[tuple] = None, background: bool = False):
+        """Build budget frontiers for the current catalog and start serving from them
+
+        signatures are (occasion, colors, styles) tuples as produced by
+        _preference_signature, by default every occasion without preferences.
+        With background set the build runs on a daemon thread and requests are
+        composed live until it finishes.
+        """
+        def build():
+            with self.metrics.stage('build_frontiers'):
+                self.frontiers = build_frontiers(self, signatures)
+
+        if not background:
+            build()
+            return None
+        thread = threading.Thread(target=build, name='frontier-builder', daemon=True)
+        thread.start()
+        return thread
+
+    def load_frontiers(self, path: str) -> bool:
+        """Serve from frontiers saved by budget_frontier.py if they were built from this catalog"""
+        try:
+            store = FrontierStore.load(path)
+        except Exception as e:
+            print(f"Warning: Could not load budget frontiers: {str(e)}")
+            return False
+        if store.fingerprint != catalog_fingerprint(self.catalog):
+            print(f"Warning: Budget frontiers in {path} were built from a different catalog, ignoring them")
+            return False
+        self.frontiers = store
+        return True
+
+    def _candidate_groups(
+        self,
+        query: np.ndarray,
+        occasion: str,
+        budget: float,
+        preferences: Dict[str, Any]
+    ) -> List[CategoryCandidates]:
+        """Scored candidates per outfit category for one request
+
+        Items are scored by similarity to the normalized style-profile query
+        when one is given, and by random tie-breaking scores otherwise.
+        """
+        occasion_styles = self.occasion_styles.get(occasion, ['Casual'])
+        if self.filter_workers:
+            return self._sharded_candidate_groups(query, occasion_styles, budget, preferences)
+
+        with self.metrics.stage('filter_candidates'):
+            candidates = self.index.candidates(occasion_styles, preferences)
+            by_category = self._cap_prices(self._split_by_category(candidates), budget)
+        considered = sum(len(positions) for positions in by_category)
+        self.metrics.count('candidates_considered', considered, stage='catalog')
+        self.metrics.observe('candidates_per_request', considered)
+        with self.metrics.stage('score_candidates'):
+            return [self._score_candidates(positions, query) for positions in by_category]
+
+    def _sharded_candidate_groups(
+        self,
+        query: np.ndarray,
+        occasion_styles: List[str],
+        budget: float,
+        preferences: Dict[str, Any]
+    ) -> List[CategoryCandidates]:
+        """_candidate_groups computed shard by shard on the filter process pool
+
+        Each shard keeps as many candidates as a cache entry holds, so the
+        merged groups are a superset of what the composer would keep.
+        """
+        args = (list(OUTFIT_CATEGORIES), budget * ITEM_BUDGET_SHARE, occasion_styles, preferences, query)
+        keep = max(self.cache_pool_size, self.composer_beam)
+        with self.metrics.stage('filter_candidates'):
+            sharded = self._get_sharded_filter(query is not None)
+            try:
+                parts = sharded.filter(*args, keep=keep)
+            except BrokenProcessPool:
+                # A worker died and took the pool with it; start a new one and retry once
+                print("Warning: Filter process pool broke, restarting it")
+                self.metrics.count('filter_pool_restarts')
+                self._restart_filter_executor(sharded.executor)
+                parts = self._get_sharded_filter(query is not None).filter(*args, keep=keep)
+        groups = []
+        for positions, prices, scores in parts:
+            self.metrics.count('candidates_considered', len(positions), stage='catalog')
+            groups.append(CategoryCandidates(
+                positions, prices, random_scores(len(positions)) if scores is None else scores,
+                self._compatibility_keys(positions), self.catalog.color[positions]
+            ))
+        return groups
+
+    def _get_sharded_filter(self, with_embeddings: bool = False) -> ShardedFilter:
+        """Sharded filter over the current catalog, moved into shared memory on first use
+
+        Item embeddings are only built and shared once a request needs them
+        for scoring; the filter is then rebuilt to include them.
+        """
+        sharded = self._sharded_filter
+        if sharded is None or (with_embeddings and sharded.embeddings is None):
+            with self._sharded_lock:
+                sharded = self._sharded_filter
+                if sharded is None or (with_embeddings and sharded.embeddings is None):
+                    workers = self.filter_workers
+                    if workers > 1 and self._filter_executor is None:
+                        self._filter_executor = ProcessPoolExecutor(
+                            workers, mp_context=multiprocessing.get_context('spawn')
+                        )
+                        self._owns_filter_executor = True
+                    sharded = self._sharded_filter = ShardedFilter(
+                        self.catalog,
+                        self.get_item_embeddings() if with_embeddings else self.item_embeddings,
+                        self._filter_executor if workers > 1 else None,
+                        workers
+                    )
+        return sharded
+
+    def _restart_filter_executor(self, broken):
+        """Drop the broken filter pool so the next use starts a new one"""
+        with self._sharded_lock:
+            # Another request may already have replaced it
+            if broken is None or self._filter_executor is not broken:
+                return
+            if self._owns_filter_executor:
+                broken.shutdown(wait=False)
+            self._filter_executor = None
+            self._owns_filter_executor = False
+            self._sharded_filter = None
+
+    def set_filter_workers(self, workers: int):
+        """Filter candidates on this many processes (1: sharded in-process, 0: bitmap index)
+
+        A pool handed on to a newer catalog version is only released here,
+        not shut down, since the newer version still uses it.
+        """
+        with self._sharded_lock:
+            self.filter_workers = workers
+            self._sharded_filter = None
+            if self._filter_executor is not None and self._owns_filter_executor:
+                self._filter_executor.shutdown()
+            self._filter_executor = None
+            self._owns_filter_executor = False
+
+    def _get_price_index(self) -> PriceIndex:
+        """Per-category price index over the current catalog, built on first use"""
+        if self._price_index is None:
+            self._price_index = PriceIndex.from_catalog(self.catalog)
+        return self._price_index
+
+    def _budget_feasible(self, budget: float) -> bool:
+        """Whether the cheapest catalog outfit fits the budget, counting the requests where it does not"""
+        if self._get_price_index().feasible(OUTFIT_CATEGORIES, budget, ITEM_BUDGET_SHARE):
+            return True
+        self.metrics.count('infeasible_budgets')
+        return False
+
+    def _cap_prices(self, by_category: List[np.ndarray], budget: float) -> List[np.ndarray]:
+        """Drop candidates too expensive to be part of any outfit under budget
+
+        Each item has to leave room for the cheapest item of the other
+        categories as well as stay within ITEM_BUDGET_SHARE of the budget.
+        """
+        caps = self._get_price_index().item_caps(OUTFIT_CATEGORIES, budget, ITEM_BUDGET_SHARE)
+        price = self.catalog.price
+        return [positions[price[positions] <= cap] for positions, cap in zip(by_category, caps)]
+
+    def _split_by_category(self, candidates: np.ndarray) -> List[np.ndarray]:
+        """Candidate positions of each outfit category, in OUTFIT_CATEGORIES order"""
+        catalog = self.catalog
+        return [
+            candidates[catalog.category[candidates] == catalog.categories.code(category)]
+            for category in OUTFIT_CATEGORIES
+        ]
+
+    def _compose_scored(
+        self,
+        groups: List[CategoryCandidates],
+        budget: float,
+        num_recommendations: int
+    ) -> List[Dict[str, Any]]:
+        """Run the composer over scored category candidates and materialize the outfits"""
+        return list(self._iter_composed(groups, budget, num_recommendations))
+
+    def _iter_composed(
+        self,
+        groups: List[CategoryCandidates],
+        budget: float,
+        num_recommendations: int
+    ) -> Iterator[Dict[str, Any]]:
+        """Compose outfits up front, then materialize and yield them one at a time"""
+        for positions in self._compose_positions(groups, budget, num_recommendations):
+            yield self._outfit_from_positions(positions)
+
+    def _compose_positions(
+        self,
+        groups: List[CategoryCandidates],
+        budget: float,
+        num_recommendations: int
+    ) -> List[List[int]]:
+        """Catalog positions of the composed outfits, best first"""
+        with self.metrics.stage('compose'):
+            outfits = compose_outfits(
+                *groups, budget, num_recommendations, beam=self.composer_beam,
+                compatibility=self.compatibility, harmony=self._get_color_harmony()
+            )
+        self.metrics.count('outfits_rejected', num_recommendations - len(outfits))
+        return [[int(pos) for pos in positions] for positions, _, _ in outfits]
+
+    def _score_candidates(
+        self,
+        positions: np.ndarray,
+        query: np.ndarray = None,
+        best: np.ndarray = None
+    ) -> CategoryCandidates:
+        """Score catalog positions for the composer, keeping only what it can use
+
+        query is a normalized style-profile vector; best optionally holds the
+        precomputed highest-scoring positions for it.
+        """
+        catalog = self.catalog
+        if query is None:
+            return CategoryCandidates(
+                positions, catalog.price[positions], random_scores(len(positions)),
+                self._compatibility_keys(positions), catalog.color[positions]
+            )
+
+        # Only the best-scoring and cheapest items survive the composer's pruning
+        beam = self.composer_beam
+        embeddings = self.get_item_embeddings()
+        if best is None:
+            best, _ = top_k(embeddings, query, beam, candidates=positions)
+        if len(positions) > beam:
+            cheapest = positions[np.argpartition(catalog.price[positions], beam)[:beam]]
+        else:
+            cheapest = positions
+        kept = np.union1d(best, cheapest).astype(np.int64)
+        return CategoryCandidates(
+            kept, catalog.price[kept], embeddings[kept] @ query, self._compatibility_keys(kept), catalog.color[kept]
+        )
+
+    def _get_color_harmony(self) -> ColorHarmony:
+        """Color-harmony table over the catalog's color vocabulary, or None when turned off"""
+        if not self.harmony_weight:
+            return None
+        harmony = self._color_harmony
+        if harmony is None or harmony.weight != self.harmony_weight:
+            harmony = self._color_harmony = ColorHarmony(self.catalog.colors, self.harmony_weight)
+        return harmony
+
+    def _get_row_harmony(self) -> ColorHarmony:
+        """Color-harmony table for items given by color name, or None when turned off"""
+        if not self.harmony_weight:
+            return None
+        harmony = self._row_harmony
+        if harmony is None or harmony.weight != self.harmony_weight:
+            harmony = self._row_harmony = ColorHarmony.default(self.harmony_weight)
+        return harmony
+
+    def _row_colors(self, colors: Iterable[str]) -> np.ndarray:
+        """Row-harmony color codes of color names, or None when harmony is turned off"""
+        harmony = self._get_row_harmony()
+        return None if harmony is None else harmony.codes(colors)
+
+    def _compatibility_keys(self, positions: np.ndarray) -> np.ndarray:
+        """Compatibility matrix keys of catalog positions, or None without compatibility data"""
+        if self.compatibility is None:
+            return None
+        if self._catalog_keys is None:
+            self._catalog_keys = self.compatibility.keys(self.catalog.ids)
+        return self._catalog_keys[positions]
+
+    def _row_compatibility_keys(self, rows: List[Dict]) -> np.ndarray:
+        """Compatibility matrix keys of dataset rows, or None without compatibility data"""
+        if self.compatibility is None:
+            return None
+        return self.compatibility.keys(str(row.get('id')) for row in rows)
+
+    def load_compatibility(self, path: str) -> bool:
+        """Score outfits with co-occurrence compatibility built by compatibility.py"""
+        try:
+            self.compatibility = OutfitCompatibility.load(path)
+        except Exception as e:
+            print(f"Warning: Could not load outfit compatibility: {str(e)}")
+            return False
+        self._catalog_keys = None
+        return True
+
+    def get_outfit_recommendations_batch(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Generate recommendations for many users at once
+
+        Each request is a dict of get_outfit_recommendations keyword arguments.
+        Requests sharing an occasion and preference signature share one
+        candidate selection, and their style profiles are scored together as
+        one matrix product per category. Returns {'results': [...], 'stats':
+        {...}} with results in input order.
+        """
+        start = time.perf_counter()
+        self.metrics.count('batch_requests', len(requests))
+        results = [None] * len(requests)
+
+        groups: Dict[tuple, List[int]] = {}
+        for i, request in enumerate(requests):
+            signature = self._preference_signature(request['occasion'], request.get('preferences'))
+            groups.setdefault(signature, []).append(i)
+
+        for signature, members in groups.items():
+            try:
+                if self.catalog is None:
+                    raise LookupError("no catalog loaded")
+                self._recommend_group(signature, [requests[i] for i in members], members, results)
+            except Exception as e:
+                if self.catalog is not None:
+                    print(f"Error generating batch recommendations: {str(e)}")
+                    self.metrics.count('errors', stage='batch')
+                for i in members:
+                    results[i] = self.get_outfit_recommendations(**self._request_arguments(requests[i]))
+
+        # Requests the catalog could not serve get the same fallbacks as single calls
+        for i, recommendations in enumerate(results):
+            if not recommendations:
+                request = self._request_arguments(requests[i])
+                results[i] = self._get_recommendations_from_samples(
+                    request['occasion'], request['budget'], request['preferences'],
+                    request['num_recommendations']
+                )
+
+        elapsed = time.perf_counter() - start
+        self.metrics.observe_stage('batch', elapsed)
+        return {
+            'results': results,
+            'stats': {
+                'requests': len(requests),
+                'groups': len(groups),
+                'outfits': sum(len(recommendations) for recommendations in results),
+                'seconds': elapsed,
+                'requests_per_second': len(requests) / elapsed if elapsed > 0 else float('inf')
+            }
+        }
+
+    def _recommend_group(
+        self,
+        signature: tuple,
+        requests: List[Dict[str, Any]],
+        members: List[int],
+        results: List[Any]
+    ):
+        """Serve requests sharing one preference signature from a single candidate selection"""
+        catalog = self.catalog
+        occasion, colors, styles = signature
+        occasion_styles = self.occasion_styles.get(occasion, ['Casual'])
+        with self.metrics.stage('filter_candidates'):
+            candidates = self.index.candidates(occasion_styles, {'colors': list(colors), 'styles': list(styles)})
+        self.metrics.count('candidates_considered', len(candidates), stage='catalog')
+        by_category = self._split_by_category(candidates)
+
+        requests = [self._request_arguments(request) for request in requests]
+        # Requests no catalog outfit can fit are left empty for the sample fallback
+        feasible = [self._budget_feasible(request['budget']) for request in requests]
+        price_index = self._get_price_index()
+        caps = np.array([
+            max(price_index.item_caps(OUTFIT_CATEGORIES, request['budget'], ITEM_BUDGET_SHARE))
+            for request in requests
+        ])
+
+        # Score every profiled request against each category in one product per block
+        profiled = [
+            j for j, request in enumerate(requests)
+            if request['style_profile'] is not None and feasible[j]
+        ]
+        queries = {j: profile_vector(requests[j]['style_profile']) for j in profiled}
+        best = {}
+        if profiled:
+            embeddings = self.get_item_embeddings()
+            query_matrix = np.stack([queries[j] for j in profiled])
+            for c, positions in enumerate(by_category):
+                ranked = top_k_batch(
+                    embeddings, query_matrix, self.composer_beam, positions,
+                    values=catalog.price, limits=caps[profiled]
+                )
+                for j, ranked_positions in zip(profiled, ranked):
+                    best[(j, c)] = ranked_positions
+
+        for j, request in enumerate(requests):
+            if not feasible[j]:
+                results[members[j]] = []
+                continue
+            groups = []
+            for c, positions in enumerate(self._cap_prices(by_category, request['budget'])):
+                groups.append(self._score_candidates(positions, queries.get(j), best.get((j, c))))
+            results[members[j]] = self._compose_scored(
+                groups, request['budget'], request['num_recommendations']
+            )
+
+    @staticmethod
+    def _preference_signature(occasion: str, preferences: Dict[str, Any]) -> tuple:
+        """Hashable (occasion, colors, styles) key, independent of list order"""
+        preferences = preferences or {}
+        return (
+            occasion,
+            tuple(sorted(preferences.get('colors') or [])),
+            tuple(sorted(preferences.get('styles') or []))
+        )
+
+    @staticmethod
+    def _request_arguments(request: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in defaults for a batch request's get_outfit_recommendations arguments"""
+        return {
+            'style_profile': request.get('style_profile'),
+            'occasion': request['occasion'],
+            'budget': request['budget'],
+            'preferences': request.get('preferences') or {},
+            'num_recommendations': request.get('num_recommendations', 3)
+        }
+
+    def get_item_embeddings(self) -> np.ndarray:
+        """Normalized (n, dim) float32 catalog embeddings, built on first use"""
+        if self.item_embeddings is None:
+            with self._embeddings_lock:
+                if self.item_embeddings is None:
+                    self.item_embeddings = build_item_embeddings(self.catalog)
+        return self.item_embeddings
+
+    def apply_catalog_delta(self, delta: CatalogDelta) -> 'WardrobeRecommender':
+        """Return a new recommender serving the catalog with delta applied
+
+        self keeps its catalog version, so requests already using it finish
+        against it. The new instance shares the thumbnail cache (minus changed
+        items) and carries the index and any built embeddings forward
+        incrementally. It also takes over the filter process pool, which self
+        keeps using but can no longer shut down. The raw dataset rows are not
+        updated and are dropped from the new instance.
+        """
+        if self.catalog is None:
+            raise ValueError("no catalog loaded to update")
+        with self.metrics.stage('catalog_update'):
+            result = apply_delta(self.catalog, self.index, self.item_embeddings, delta, self._lineage)
+
+        with self._sharded_lock:
+            updated = copy.copy(self)
+            self._owns_filter_executor = False
+        updated.catalog_version = next(_catalog_versions)
+        updated.dataset = None
+        updated.catalog = result.catalog
+        updated.index = result.index
+        updated.item_embeddings = result.embeddings
+        updated._lineage = result.lineage
+        updated._embeddings_lock = threading.Lock()
+        # The filter process pool is handed over; shards are rebuilt for the new catalog on first use
+        updated._sharded_filter = None
+        updated._sharded_lock = threading.Lock()
+        updated._price_index = None
+        # Compatibility is keyed by item id; only the per-position keys change
+        updated._catalog_keys = None
+        # New items may have added colors to the vocabulary
+        updated._color_harmony = None
+        # Frontiers hold catalog positions of the previous version
+        updated.frontiers = None
+        cache = self.result_cache
+        updated.result_cache = RecommendationCache(
+            cache.max_entries, cache.ttl_seconds, clock=cache.clock
+        )
+        for item_id in result.changed_ids:
+            self.thumbnail_cache.discard((item_id, self.thumbnail_size))
+
+        stats = result.stats
+        self.metrics.count('catalog_updates')
+        print(
+            f"Applied catalog update v{updated.catalog_version}: {stats['added']} added, "
+            f"{stats['removed']} removed, {stats['repriced']} repriced, {stats['missing']} unknown ids "
+            f"in {stats['seconds'] * 1000:.1f} ms"
+        )
+        return updated
+
+    def _get_recommendations_from_dataset_rows(
+        self,
+        style_profile: 'torch.Tensor',
         occasion: str,
         budget: float,
         preferences: Dict[str, Any],
         num_recommendations: int
     ) -> List[Dict[str, Any]]:
-        """Generate recommendations using the Polyvore dataset"""
+        """Generate recommendations by scanning the Polyvore dataset row by row"""
         recommendations = []
         
         # Get style tags for the occasion
@@ -200,7 +944,7 @@ class WardrobeRecommender:
         filtered_items = []
         for item in self.dataset:
             if (
-                item.get('price', float('inf')) <= budget * 0.4  # Single item should not exceed 40% of budget
+                item.get('price', float('inf')) <= budget * ITEM_BUDGET_SHARE  # Single item should not exceed 40% of budget
                 and self._matches_preferences(item, preferences)
                 and any(style in item.get('style_tags', []) for style in occasion_styles)
             ):
@@ -210,21 +954,75 @@ class WardrobeRecommender:
                     try:
                         # Convert image data to base64 if it's not already
                         if isinstance(image_data, bytes):
-                            image_data = base64.b64encode(image_data).decode('utf-8')
+                            with self.metrics.stage('image_encode'):
+                                image_data = base64.b64encode(image_data).decode('utf-8')
                         item['image_data'] = image_data
                     except Exception as e:
                         print(f"Error processing image data: {e}")
+                        self.metrics.count('errors', stage='image_encode')
                         item['image_data'] = None
                 filtered_items.append(item)
+        self.metrics.count('candidates_considered', len(filtered_items), stage='dataset')
         
         # Create outfits from filtered items
         for _ in range(num_recommendations):
             outfit = self._create_outfit(filtered_items, budget)
             if outfit:
                 recommendations.append(outfit)
+            else:
+                self.metrics.count('outfits_rejected')
         
         return recommendations
-    
+
+    def _get_recommendations_from_dataset_stream(
+        self,
+        style_profile: 'torch.Tensor',
+        occasion: str,
+        budget: float,
+        preferences: Dict[str, Any],
+        num_recommendations: int,
+        rows: Iterable[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Generate recommendations in one pass over dataset rows with bounded memory
+
+        rows defaults to the loaded dataset and may be any iterable, such as a
+        streaming dataset. Matching rows are sampled into a weighted reservoir
+        of reservoir_size rows per outfit category, weighted by how many of
+        the occasion's styles they carry, so memory per request does not grow
+        with the catalog. Images are encoded only for the items picked.
+        """
+        occasion_styles = self.occasion_styles.get(occasion, ['Casual'])
+        rows = self.dataset if rows is None else rows
+        reservoirs = {category: WeightedReservoir(self.reservoir_size) for category in OUTFIT_CATEGORIES}
+        max_price = budget * ITEM_BUDGET_SHARE
+        matched = 0
+        for row in rows:
+            reservoir = reservoirs.get((row.get('category') or '').lower())
+            price = row.get('price')
+            if reservoir is None or price is None or price > max_price:
+                continue
+            style_tags = row.get('style_tags') or []
+            weight = sum(style in style_tags for style in occasion_styles)
+            if weight and self._matches_preferences(row, preferences):
+                matched += 1
+                reservoir.offer(row, weight)
+        self.metrics.count('candidates_considered', matched, stage='dataset')
+
+        groups = []
+        for category in OUTFIT_CATEGORIES:
+            items = reservoirs[category].items()
+            groups.append(CategoryCandidates.from_lists(
+                items, [item['price'] for item in items], random_scores(len(items)),
+                self._row_compatibility_keys(items), self._row_colors(item.get('color') for item in items)
+            ))
+        with self.metrics.stage('compose'):
+            outfits = compose_outfits(
+                *groups, budget, num_recommendations, beam=self.composer_beam,
+                compatibility=self.compatibility, harmony=self._get_row_harmony()
+            )
+        self.metrics.count('outfits_rejected', num_recommendations - len(outfits))
+        return [self._outfit_from_rows(selected, total_price) for selected, total_price, _ in outfits]
+
     def _get_recommendations_from_samples(
         self,
         occasion: str,
@@ -236,53 +1034,43 @@ class WardrobeRecommender:
         recommendations = []
         occasion_styles = self.occasion_styles.get(occasion, [])
         
-        # Convert sample items to list format and filter by preferences
-        filtered_items = []
-        for category_items in self.sample_items.values():
-            for item in category_items:
-                # Check if item style matches occasion and preferences
-                if any(style in item.style_tags for style in occasion_styles):
-                    if not preferences.get('colors') or item.color in preferences['colors']:
-                        if not preferences.get('styles') or any(style in item.style_tags for style in preferences['styles']):
-                            filtered_items.append(item)
+        # Select sample items matching the occasion and preferences through the index
+        filtered_items = [
+            self._sample_list[pos]
+            for pos in self.sample_index.candidates(occasion_styles, preferences)
+        ]
+        self.metrics.count('candidates_considered', len(filtered_items), stage='samples')
         
-        # Generate outfits
-        for _ in range(num_recommendations):
-            outfit_items = []
-            total_price = 0
-            used_categories = set()
-            
-            # Try to add one item from each main category
-            for category in ['tops', 'bottoms', 'shoes']:
-                available_items = [item for item in filtered_items 
-                                 if item.category == category and 
-                                 total_price + item.price <= budget]
-                if available_items:
-                    item = random.choice(available_items)
-                    outfit_items.append({
+        # Compose the best outfits under budget from the matching items
+        groups = []
+        for category in OUTFIT_CATEGORIES:
+            items = [item for item in filtered_items if item.category == category]
+            groups.append(CategoryCandidates.from_lists(
+                items, [item.price for item in items], random_scores(len(items)),
+                colors=self._row_colors(item.color for item in items)
+            ))
+        with self.metrics.stage('compose'):
+            outfits = compose_outfits(*groups, budget, num_recommendations, harmony=self._get_row_harmony())
+        for outfit, total_price, _ in outfits:
+            recommendations.append({
+                'set_id': f'outfit_{random.randint(1000, 9999)}',
+                'total_price': total_price,
+                'items': [
+                    {
                         'name': item.name,
                         'category': item.category,
                         'price': item.price,
                         'color': item.color,
                         'purchase_link': item.purchase_link,
                         'description': item.description
-                    })
-                    total_price += item.price
-                    used_categories.add(category)
-            
-            # Only add complete outfits
-            if len(outfit_items) >= 3:
-                recommendations.append({
-                    'set_id': f'outfit_{random.randint(1000, 9999)}',
-                    'total_price': total_price,
-                    'items': outfit_items
-                })
+                    }
+                    for item in outfit
+                ]
+            })
         
-        # If we couldn't generate enough recommendations, fill with fallback options
-        while len(recommendations) < num_recommendations:
-            fallback = self._get_fallback_recommendations(budget, 1)[0]
-            if fallback not in recommendations:
-                recommendations.append(fallback)
+        # Placeholder outfits only when no real outfit fits the budget
+        if not recommendations:
+            recommendations = self._get_fallback_recommendations(budget, num_recommendations)
         
         return recommendations
 
@@ -331,6 +1119,7 @@ class WardrobeRecommender:
         num_recommendations: int
     ) -> List[Dict[str, Any]]:
         """Generate fallback recommendations when other methods fail"""
+        self.metrics.count('fallback_recommendations', num_recommendations)
         recommendations = []
         
         for i in range(num_recommendations):
@@ -386,49 +1175,134 @@ class WardrobeRecommender:
     
     def _create_outfit(self, items: List[Dict], budget: float) -> Dict[str, Any]:
         """Create a complete outfit from available items within budget"""
-        outfit_items = []
-        total_price = 0
-        
-        # Ensure we have one item from each main category
-        for category in ['tops', 'bottoms', 'shoes']:
+        groups = []
+        for category in OUTFIT_CATEGORIES:
             category_items = [
-                item for item in items 
-                if item.get('category', '').lower() == category 
-                and total_price + item.get('price', 0) <= budget
+                item for item in items
+                if item.get('category', '').lower() == category
             ]
-            
-            if category_items:
-                selected_item = random.choice(category_items)
-                outfit_items.append({
-                    'name': selected_item.get('name', f'Item {len(outfit_items) + 1}'),
-                    'category': selected_item.get('category', '').lower(),
-                    'price': selected_item.get('price', 0),
-                    'color': selected_item.get('color', 'Unknown'),
-                    'purchase_link': selected_item.get('purchase_link', 'https://example.com'),
-                    'description': selected_item.get('description', ''),
-                    'image_data': selected_item.get('image_data')
-                })
-                total_price += selected_item.get('price', 0)
-        
-        if len(outfit_items) < 3:  # If we couldn't get all necessary items
+            groups.append(CategoryCandidates.from_lists(
+                category_items,
+                [item.get('price', 0) for item in category_items],
+                random_scores(len(category_items)),
+                self._row_compatibility_keys(category_items),
+                self._row_colors(item.get('color') for item in category_items)
+            ))
+
+        outfits = compose_outfits(
+            *groups, budget, 1, compatibility=self.compatibility, harmony=self._get_row_harmony()
+        )
+        if not outfits:  # If no complete outfit fits the budget
             return None
-            
+
+        selected_items, total_price, _ = outfits[0]
+        return self._outfit_from_rows(selected_items, total_price)
+
+    def _outfit_from_rows(self, rows: Iterable[Dict], total_price: float) -> Dict[str, Any]:
+        """Materialize an outfit dict from selected dataset rows"""
+        outfit_items = []
+        for row in rows:
+            outfit_items.append({
+                'name': row.get('name', f'Item {len(outfit_items) + 1}'),
+                'category': row.get('category', '').lower(),
+                'price': row.get('price', 0),
+                'color': row.get('color', 'Unknown'),
+                'purchase_link': row.get('purchase_link', 'https://example.com'),
+                'description': row.get('description', ''),
+                'image_data': self._row_image_data(row)
+            })
+
         return {
             'set_id': f'outfit_{random.randint(1000, 9999)}',
             'total_price': total_price,
             'items': outfit_items
         }
-    
-    def filter_by_budget(self, items: List[Dict], budget: float) -> List[Dict]:
-        """Filter items by budget constraints"""
+
+    def _row_image_data(self, row: Dict) -> Any:
+        """Image of a dataset row as attached by the row scan, encoding raw bytes on demand"""
+        if 'image_data' in row:
+            return row['image_data']
+        image_data = row.get('image')
+        if isinstance(image_data, bytes):
+            try:
+                with self.metrics.stage('image_encode'):
+                    return base64.b64encode(image_data).decode('utf-8')
+            except Exception as e:
+                print(f"Error processing image data: {e}")
+                self.metrics.count('errors', stage='image_encode')
+                return None
+        return image_data or None
+
+    def _outfit_from_positions(self, positions: List[int]) -> Dict[str, Any]:
+        """Materialize an outfit dict for catalog positions, resolving thumbnails only now"""
+        outfit_items = []
+        total_price = 0
+        for pos in positions:
+            # Read only the fields shown, straight from the catalog arrays
+            item = self.catalog.item(pos)
+            price = item.price
+            outfit_items.append({
+                'name': item.name or f'Item {len(outfit_items) + 1}',
+                'category': item.category,
+                'price': price,
+                'color': item.color or 'Unknown',
+                'purchase_link': item.purchase_link or 'https://example.com',
+                'description': item.description or '',
+                'image_data': self._thumbnail(pos, item.id)
+            })
+            total_price += price
+
+        return {
+            'set_id': f'outfit_{random.randint(1000, 9999)}',
+            'total_price': total_price,
+            'items': outfit_items
+        }
+
+    def _thumbnail(self, pos: int, item_id: str = None):
+        """Base64 JPEG thumbnail for the item at pos, served from the thumbnail cache"""
+        key = (item_id if item_id is not None else pos, self.thumbnail_size)
+
+        catalog = self.catalog
+        if catalog.thumbnails is not None and catalog.thumbnail_size == tuple(self.thumbnail_size):
+            # Precomputed at ingestion time; items added since are rendered below
+            thumbnail = catalog.thumbnails[pos]
+            if thumbnail is not None:
+                return thumbnail
+
+        def render():
+            try:
+                with self.metrics.stage('image_encode'):
+                    return make_thumbnail(self.catalog.image(pos), self.thumbnail_size)
+            except Exception as e:
+                print(f"Error processing image data: {e}")
+                return None
+
+        return self.thumbnail_cache.get_or_create(key, render)
+
+    def filter_by_budget(self, items: List[Dict], budget: float, best_subset: bool = False) -> List[Dict]:
+        """Filter items by budget constraints
+
+        By default items are taken in order, skipping any that no longer fit.
+        With best_subset the items spending the most of the budget are chosen
+        instead, keeping their original order.
+        """
+        if best_subset:
+            return [items[i] for i in best_subset_indices([item['price'] for item in items], budget)]
+
         filtered_items = []
         total_cost = 0
-        
-        for item in items:
+        # Cheapest price from each item onwards; once even that no longer fits, nothing later will
+        remaining_min = np.minimum.accumulate(
+            np.array([item['price'] for item in items], dtype=np.float64)[::-1]
+        )[::-1]
+
+        for i, item in enumerate(items):
+            if total_cost + remaining_min[i] > budget:
+                break
             if total_cost + item['price'] <= budget:
                 filtered_items.append(item)
                 total_cost += item['price']
-                
+
         return filtered_items
     
     def filter_by_preferences(
@@ -440,6 +1314,13 @@ class WardrobeRecommender:
         """Filter items by user preferences"""
         if not color_preferences and not style_preferences:
             return items
+
+        # The loaded dataset is already indexed, so only matching rows are touched
+        if self.index is not None and items is self.dataset:
+            positions = self.index.candidates(
+                None, {'colors': color_preferences, 'styles': style_preferences}
+            )
+            return [items[int(pos)] for pos in positions]
             
         filtered_items = []
         for item in items:
@@ -449,4 +1330,60 @@ class WardrobeRecommender:
             if color_match and style_match:
                 filtered_items.append(item)
                 
-        return filtered_items 
+        return filtered_items
+
+
+# Process-wide recommender shared read-only by every session and thread.
+# Readers take a reference once per request; reloads build a new instance
+# off to the side and publish it with a single assignment.
+_catalog_versions = itertools.count(1)
+_shared_recommender = None
+_shared_lock = threading.Lock()
+
+
+def _new_shared_recommender() -> WardrobeRecommender:
+    recommender = WardrobeRecommender()
+    # Budget frontiers built offline for this catalog by budget_frontier.py
+    path = os.environ.get('WARDROBE_FRONTIERS')
+    if path and recommender.catalog is not None:
+        recommender.load_frontiers(path)
+    return recommender
+
+
+def get_shared_recommender() -> WardrobeRecommender:
+    """Return the process-wide recommender, building it on first use"""
+    global _shared_recommender
+    recommender = _shared_recommender
+    if recommender is None:
+        with _shared_lock:
+            if _shared_recommender is None:
+                _shared_recommender = _new_shared_recommender()
+            recommender = _shared_recommender
+    return recommender
+
+
+def reload_shared_recommender() -> WardrobeRecommender:
+    """Rebuild the shared recommender and publish it under a new catalog version
+
+    Requests already holding the previous instance finish against it unchanged.
+    """
+    global _shared_recommender
+    with _shared_lock:
+        _shared_recommender = _new_shared_recommender()
+        return _shared_recommender
+
+
+def update_shared_recommender(delta: CatalogDelta) -> WardrobeRecommender:
+    """Apply an incremental catalog update to the shared recommender and publish the result"""
+    global _shared_recommender
+    with _shared_lock:
+        if _shared_recommender is None:
+            _shared_recommender = _new_shared_recommender()
+        _shared_recommender = _shared_recommender.apply_catalog_delta(delta)
+        return _shared_recommender
+
+
+def shared_catalog_version() -> int:
+    """Catalog version of the shared recommender, or 0 if it has not been built"""
+    recommender = _shared_recommender
+    return 0 if recommender is None else recommender.catalog_version
@@ -1,8 +1,7 @@
 import streamlit as st
-from WardrobeRecommender import WardrobeRecommender
-from PIL import Image
-import io
-import base64
+from WardrobeRecommender import get_shared_recommender
+from style_profile import PALETTE, profile_from_upload
+from html import escape
 
 def set_custom_style():
     st.markdown("""
@@ -192,6 +191,65 @@ def set_custom_style():
     </style>
     """, unsafe_allow_html=True)
 
+LOOKS_PER_PAGE = 6
+
+def _turn_page(step):
+    st.session_state.look_page = st.session_state.get("look_page", 0) + step
+
+def render_looks(looks, start=0):
+    """All look cards of a page as one HTML payload
+
+    Each distinct thumbnail is embedded once as a CSS class and referenced by
+    every item that shows it, and off-screen cards skip layout and painting
+    until they are scrolled into view.
+    """
+    thumbnails = {}
+    cards = []
+    for i, outfit in enumerate(looks, start + 1):
+        items = []
+        for item in outfit['items']:
+            image = ''
+            if item.get('image_data'):
+                thumb = thumbnails.setdefault(item['image_data'], f"look-thumb-{len(thumbnails)}")
+                image = f"<div class='look-thumb {thumb}'></div>"
+            link = (
+                f"<a href='{escape(item['purchase_link'])}' target='_blank' class='shop-button'>Shop Now</a>"
+                if item.get('purchase_link') else ''
+            )
+            items.append(f"""
+                <div class='look-item'>
+                    {image}
+                    <div class='item-details'>
+                        <div class='item-name'>{escape(item['name'])}</div>
+                        <div class='item-category'>{escape(item['category'].title())}</div>
+                        <div class='item-price'>${item['price']:.2f}</div>
+                        <div style='color: #666666;'>Color: {escape(str(item['color']))}</div>
+                        {link}
+                    </div>
+                </div>""")
+        cards.append(f"""
+            <div class='recommendation-card look-card'>
+                <h3>Look {i} - Curated Outfit</h3>
+                <div class='price-tag'>Total Budget: ${outfit['total_price']:.2f}</div>
+                <div class='look-items'>{''.join(items)}</div>
+            </div>""")
+
+    thumbnail_css = ''.join(
+        f".{thumb} {{ background-image: url('data:image/jpeg;base64,{data}'); }}"
+        for data, thumb in thumbnails.items()
+    )
+    payload = f"""
+        <style>
+            .look-card {{ content-visibility: auto; contain-intrinsic-size: auto 520px; }}
+            .look-items {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(160px, 1fr)); gap: 1rem; margin-top: 1rem; }}
+            .look-thumb {{ width: 100%; aspect-ratio: 1; background-size: contain; background-position: center; background-repeat: no-repeat; border-radius: 12px; }}
+            {thumbnail_css}
+        </style>
+        {''.join(cards)}
+    """
+    # One line, so markdown never reads indented or blank-separated HTML as a code block
+    return ''.join(line.strip() for line in payload.splitlines())
+
 def main():
     set_custom_style()
     
@@ -247,30 +305,29 @@ def main():
         help="Add a profile photo to personalize your experience"
     )
     
+    style_profile = None
     if uploaded_file is not None:
-        try:
-            # Display the uploaded image
-            image = Image.open(uploaded_file)
-            # Resize image to a reasonable size
-            max_size = (150, 150)
-            image.thumbnail(max_size, Image.LANCZOS)
-            # Convert to bytes for display
-            img_byte_arr = io.BytesIO()
-            image.save(img_byte_arr, format='PNG')
-            img_byte_arr = img_byte_arr.getvalue()
-            img_b64 = base64.b64encode(img_byte_arr).decode()
-            
+        # Profile and thumbnail are cached by the photo's content hash across reruns
+        profile = profile_from_upload(uploaded_file.getvalue())
+        if profile is not None:
+            style_profile = profile.vector
+            swatches = ''.join(
+                f"<span title='{name} {share:.0%}' style='display: inline-block; width: 18px; height: 18px; "
+                f"margin: 0 3px; border-radius: 50%; border: 1px solid #e9ecef; background: rgb{PALETTE[name]};'></span>"
+                for name, share in profile.colors
+            )
             st.sidebar.markdown(f"""
                 <div style='text-align: center; margin: 1rem 0;'>
                     <div style='width: 150px; height: 150px; margin: 0 auto; border-radius: 50%; overflow: hidden; border: 3px solid #1a1a1a; box-shadow: 0 4px 8px rgba(0,0,0,0.1); transition: all 0.3s ease;'
                          onmouseover='this.style.transform="scale(1.05)"; this.style.boxShadow="0 8px 16px rgba(0,0,0,0.2)"'
                          onmouseout='this.style.transform="scale(1)"; this.style.boxShadow="0 4px 8px rgba(0,0,0,0.1)"'>
-                        <img src='data:image/png;base64,{img_b64}' style='width: 100%; height: 100%; object-fit: cover;'>
+                        <img src='data:image/png;base64,{profile.thumbnail}' style='width: 100%; height: 100%; object-fit: cover;'>
                     </div>
-                    <p style='color: #666666; font-size: 0.9rem; margin-top: 0.5rem;'>Add your picture</p>
+                    <div style='margin-top: 0.5rem;'>{swatches}</div>
+                    <p style='color: #666666; font-size: 0.9rem; margin-top: 0.5rem;'>Your palette</p>
                 </div>
             """, unsafe_allow_html=True)
-        except Exception as e:
+        else:
             st.sidebar.error("Error processing image. Please try another image.")
     else:
         # Display default profile icon
@@ -306,8 +363,8 @@ def main():
         </style>
     """, unsafe_allow_html=True)
 
-    # Initialize the recommender
-    recommender = WardrobeRecommender()
+    # Reuse the process-wide recommender; only widget inputs live in the session
+    recommender = get_shared_recommender()
 
     # Sidebar for user inputs
     st.sidebar.markdown("<h2>Style Preferences</h2>", unsafe_allow_html=True)
@@ -348,50 +405,73 @@ def main():
         key="style_select"
     )
 
+    # Number of looks to curate
+    num_looks = st.sidebar.slider(
+        "How many looks?",
+        min_value=3,
+        max_value=30,
+        value=3,
+        key="num_looks"
+    )
+
     # Get recommendations button
-    if st.sidebar.button("Generate Outfits", key="get_recommendations"):
+    generate = st.sidebar.button("Generate Outfits", key="get_recommendations")
+    if generate:
+        st.session_state.looks_occasion = occasion
+        st.session_state.look_page = 0
+        # A new seed per click recomposes the cached candidate pool, so repeat
+        # clicks show fresh looks instead of the cached ones
+        st.session_state.generate_clicks = st.session_state.get("generate_clicks", 0) + 1
+    if generate or st.session_state.get("looks"):
+        st.markdown(f"<h2>Curated Looks for {escape(st.session_state.looks_occasion)}</h2>", unsafe_allow_html=True)
+    # The page's cards are one payload; it is replaced as a whole on every update
+    page_placeholder = st.empty()
+
+    if generate:
         with st.spinner("Curating your personalized outfits..."):
             preferences = {
                 "colors": color_preference,
                 "styles": style_preference
             }
-
-            # Get recommendations
-            recommendations = recommender.get_outfit_recommendations(
-                style_profile=None,
+            recommendations = recommender.iter_outfit_recommendations(
+                style_profile=style_profile,
                 occasion=occasion,
                 budget=budget,
                 preferences=preferences,
-                num_recommendations=3
+                num_recommendations=num_looks,
+                session_seed=st.session_state.generate_clicks
             )
+            # Re-render the first page as each look arrives; later looks are
+            # only collected for the following pages
+            looks = []
+            for outfit in recommendations:
+                looks.append(outfit)
+                if len(looks) <= LOOKS_PER_PAGE:
+                    page_placeholder.markdown(render_looks(looks), unsafe_allow_html=True)
+            # Keep the looks in the session so paging reruns don't recompute them
+            st.session_state.looks = looks
 
-            # Display recommendations
-            st.markdown(f"<h2>Curated Looks for {occasion}</h2>", unsafe_allow_html=True)
-            
-            for i, outfit in enumerate(recommendations, 1):
-                st.markdown(f"""
-                    <div class='recommendation-card'>
-                        <h3>Look {i} - Curated Outfit</h3>
-                        <div class='price-tag'>Total Budget: ${outfit['total_price']:.2f}</div>
-                    </div>
-                """, unsafe_allow_html=True)
-                
-                # Create columns for each item in the outfit
-                cols = st.columns(len(outfit['items']))
-                
-                for j, (col, item) in enumerate(zip(cols, outfit['items'])):
-                    with col:
-                        if 'image_data' in item and item['image_data']:
-                            st.image(item['image_data'], key=f"image_{i}_{j}")
-                        st.markdown(f"""
-                            <div class='item-details'>
-                                <div class='item-name'>{item['name']}</div>
-                                <div class='item-category'>{item['category'].title()}</div>
-                                <div class='item-price'>${item['price']:.2f}</div>
-                                <div style='color: #666666;'>Color: {item['color']}</div>
-                                {f"<a href='{item['purchase_link']}' target='_blank' class='shop-button'>Shop Now</a>" if item['purchase_link'] else ''}
-                            </div>
-                        """, unsafe_allow_html=True)
+    looks = st.session_state.get("looks")
+    if looks:
+        pages = (len(looks) + LOOKS_PER_PAGE - 1) // LOOKS_PER_PAGE
+        page = min(st.session_state.get("look_page", 0), pages - 1)
+        start = page * LOOKS_PER_PAGE
+        if not generate:
+            page_placeholder.markdown(render_looks(looks[start:start + LOOKS_PER_PAGE], start), unsafe_allow_html=True)
+
+        if pages > 1:
+            previous_col, label_col, next_col = st.columns([1, 2, 1])
+            with previous_col:
+                st.button("Previous", key="previous_looks", disabled=page == 0,
+                          on_click=_turn_page, args=(-1,))
+            with label_col:
+                st.markdown(
+                    f"<p style='text-align: center; color: #666666;'>Page {page + 1} of {pages}</p>",
+                    unsafe_allow_html=True
+                )
+            with next_col:
+                st.button("Next", key="next_looks", disabled=page == pages - 1,
+                          on_click=_turn_page, args=(1,))
 
 if __name__ == "__main__":
     main()
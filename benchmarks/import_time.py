@@ -0,0 +1,69 @@
+"""Report what importing the recommender costs and fail if heavy dependencies creep back in
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --module app --max-ms 2000 --top 20
+
+The module is imported in a fresh interpreter with -X importtime. The report
+lists the most expensive modules by their own (self) import time along with
+their cumulative time, and the check fails when any forbidden package (torch, datasets and sklearn by
+default) was imported or when the total exceeds --max-ms.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORBIDDEN = ('torch', 'datasets', 'sklearn')
+
+
+def measure(module: str, tree: str = REPO_ROOT) -> List[Tuple[str, int, int]]:
+    """(module, self microseconds, cumulative microseconds) for every module imported"""
+    env = dict(os.environ, WARDROBE_SAMPLE_DATA='1')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=tree, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{completed.stderr}")
+
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        timings.append((name.strip(), int(own), int(cumulative)))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time regression check")
+    parser.add_argument('--module', default='WardrobeRecommender')
+    parser.add_argument('--forbid', default=','.join(FORBIDDEN), help="Comma-separated packages that must not load")
+    parser.add_argument('--max-ms', type=float, default=None, help="Fail if the total import time exceeds this")
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    timings = measure(args.module)
+    imported = [name for name, _, _ in timings]
+    total_ms = next(cumulative for name, _, cumulative in timings if name == args.module) / 1000
+    print(f"import {args.module}: {total_ms:.1f} ms across {len(imported)} modules")
+    print(f"  {'module':<36} {'self ms':>9} {'cumulative ms':>14}")
+    for name, own, cumulative in sorted(timings, key=lambda timing: -timing[1])[:args.top]:
+        print(f"  {name:<36} {own / 1000:9.1f} {cumulative / 1000:14.1f}")
+
+    failures = []
+    forbidden = [name for name in args.forbid.split(',') if name]
+    loaded = sorted({name.split('.')[0] for name in imported} & set(forbidden))
+    if loaded:
+        failures.append(f"heavy dependencies imported: {', '.join(loaded)}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        failures.append(f"import took {total_ms:.1f} ms, budget is {args.max_ms:.1f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""Benchmark the recommender hot paths on synthetic catalogs
+
+    python benchmarks/run_benchmarks.py --sizes 1k,100k
+    python benchmarks/run_benchmarks.py --sizes 1k,100k,1m --paths dataset
+    python benchmarks/run_benchmarks.py --compare HEAD~5 HEAD
+
+Each (path, size) pair runs in a fresh subprocess so that peak RSS is
+attributable to that path. With --compare, each revision is checked out into
+a temporary git worktree and benchmarked with this harness, so revisions
+that predate it can be measured too.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+
+PATHS = ['dataset', 'dataset_stream', 'samples', 'create_outfit', 'filter_by_budget', 'filter_by_preferences']
+OCCASIONS = ['Wedding', 'Business Meeting', 'Casual Outing', 'Party', 'Date Night']
+PREFERENCE_COLORS = ['Black', 'White', 'Blue', 'Red', 'Green', 'Pink', 'Purple', 'Yellow']
+PREFERENCE_STYLES = ['Casual', 'Formal', 'Professional', 'Trendy', 'Classic', 'Elegant', 'Comfortable']
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def random_requests(count: int, seed: int) -> List[Dict[str, Any]]:
+    """Sidebar-shaped requests: occasion, $50-stepped budget and a few preferences"""
+    rng = random.Random(seed)
+    return [
+        {
+            'occasion': rng.choice(OCCASIONS),
+            'budget': float(rng.randrange(100, 1001, 50)),
+            'preferences': {
+                'colors': rng.sample(PREFERENCE_COLORS, rng.randint(0, 3)),
+                'styles': rng.sample(PREFERENCE_STYLES, rng.randint(0, 2))
+            }
+        }
+        for _ in range(count)
+    ]
+
+
+def build_recommender(module, size: int, seed: int, row_limit: int):
+    """Construct a recommender over a synthetic catalog without touching the network"""
+    from synthetic_catalog import generate_catalog, generate_rows
+
+    class BenchmarkRecommender(module.WardrobeRecommender):
+        def load_dataset(self):
+            self._initialize_sample_data()
+
+    rows = list(generate_rows(min(size, row_limit), seed))
+    if hasattr(BenchmarkRecommender, 'from_catalog'):
+        recommender = BenchmarkRecommender.from_catalog(generate_catalog(size, seed))
+    else:
+        # Trees without a columnar catalog scan the row dicts directly
+        recommender = BenchmarkRecommender()
+        recommender.dataset = rows if size <= row_limit else list(generate_rows(size, seed))
+
+    fields = module.FashionItem.__dataclass_fields__ if hasattr(module.FashionItem, '__dataclass_fields__') else None
+    sample_items: Dict[str, list] = {}
+    for row in rows:
+        values = {name: row.get(name) for name in (fields or row)}
+        sample_items.setdefault(row['category'], []).append(module.FashionItem(**values))
+    if hasattr(recommender, 'set_sample_items'):
+        recommender.set_sample_items(sample_items)
+    else:
+        recommender.sample_items = sample_items
+    return recommender, rows
+
+
+def run_worker(args: argparse.Namespace) -> Dict[str, Any]:
+    """Measure one path at one size inside this process"""
+    sys.path.insert(0, args.tree)
+    import WardrobeRecommender as module
+
+    setup_start = time.perf_counter()
+    recommender, rows = build_recommender(module, args.size, args.seed, args.row_limit)
+    setup_seconds = time.perf_counter() - setup_start
+    setup_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    calls = {
+        'dataset': lambda request: recommender._get_recommendations_from_dataset(
+            None, request['occasion'], request['budget'], request['preferences'], 3
+        ),
+        'dataset_stream': lambda request: recommender._get_recommendations_from_dataset_stream(
+            None, request['occasion'], request['budget'], request['preferences'], 3, rows=iter(rows)
+        ),
+        'samples': lambda request: recommender._get_recommendations_from_samples(
+            request['occasion'], request['budget'], request['preferences'], 3
+        ),
+        'create_outfit': lambda request: recommender._create_outfit(rows, request['budget']),
+        'filter_by_budget': lambda request: recommender.filter_by_budget(rows, request['budget']),
+        'filter_by_preferences': lambda request: recommender.filter_by_preferences(
+            rows, request['preferences']['colors'], request['preferences']['styles']
+        )
+    }
+    call = calls[args.path]
+    requests = random_requests(args.repeat + args.warmup, args.seed)
+    for request in requests[:args.warmup]:
+        call(request)
+
+    latencies = []
+    for request in requests[args.warmup:]:
+        start = time.perf_counter()
+        call(request)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies)
+
+    return {
+        'path': args.path,
+        'size': args.size,
+        'rows': len(rows),
+        'calls': len(latencies),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p99_ms': float(np.percentile(latencies, 99) * 1000),
+        'throughput_per_s': float(len(latencies) / latencies.sum()) if latencies.sum() else float('inf'),
+        'setup_seconds': setup_seconds,
+        'setup_rss_mb': setup_rss / 1024,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def run_suite(tree: str, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Run every requested (path, size) pair against tree, each in its own subprocess"""
+    results = []
+    for size in args.sizes:
+        for path in args.paths:
+            command = [
+                sys.executable, os.path.abspath(__file__), '--worker',
+                '--tree', tree, '--path', path, '--size', str(size),
+                '--repeat', str(args.repeat), '--warmup', str(args.warmup),
+                '--seed', str(args.seed), '--row-limit', str(args.row_limit)
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True, cwd=tree)
+            lines = completed.stdout.strip().splitlines()
+            if completed.returncode != 0 or not lines:
+                print(f"  {path} @ {size}: failed\n{completed.stderr.strip()}", file=sys.stderr)
+                continue
+            result = json.loads(lines[-1])
+            print(
+                f"  {path:<22} {size:>9}  p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+                f"{result['throughput_per_s']:10.1f}/s  peak {result['peak_rss_mb']:8.1f} MB",
+                file=sys.stderr
+            )
+            results.append(result)
+    return results
+
+
+def compare(revisions: List[str], args: argparse.Namespace) -> Dict[str, List[Dict[str, Any]]]:
+    """Benchmark each git revision in a temporary worktree"""
+    results = {}
+    for revision in revisions:
+        worktree = tempfile.mkdtemp(prefix='wardrobe-bench-')
+        subprocess.run(
+            ['git', 'worktree', 'add', '--detach', worktree, revision],
+            cwd=REPO_ROOT, check=True, capture_output=True
+        )
+        try:
+            print(f"{revision}:", file=sys.stderr)
+            results[revision] = run_suite(worktree, args)
+        finally:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=REPO_ROOT, capture_output=True)
+            shutil.rmtree(worktree, ignore_errors=True)
+
+    base, head = revisions
+    by_key = {(r['path'], r['size']): r for r in results[base]}
+    print(f"\n{'path':<22} {'size':>9} {'p50 ratio':>10} {'p99 ratio':>10} {'rss ratio':>10}", file=sys.stderr)
+    for result in results[head]:
+        before = by_key.get((result['path'], result['size']))
+        if before:
+            print(
+                f"{result['path']:<22} {result['size']:>9} "
+                f"{result['p50_ms'] / before['p50_ms']:>10.3f} {result['p99_ms'] / before['p99_ms']:>10.3f} "
+                f"{result['peak_rss_mb'] / before['peak_rss_mb']:>10.3f}",
+                file=sys.stderr
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recommender hot paths on synthetic catalogs")
+    parser.add_argument('--sizes', default='1k,100k', help="Comma-separated catalog sizes, e.g. 1k,100k,1m")
+    parser.add_argument('--paths', default=','.join(PATHS), help="Comma-separated subset of " + ','.join(PATHS))
+    parser.add_argument('--repeat', type=int, default=50, help="Timed calls per path")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--row-limit', type=int, default=100000,
+                        help="Cap on row dicts for the list-based paths (samples, create_outfit, filters)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help="Compare two git revisions")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    # Internal: run a single measurement in this process
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--tree', default=REPO_ROOT, help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    args.sizes = [parse_size(size) for size in args.sizes.split(',')]
+    args.paths = [path.strip() for path in args.paths.split(',')]
+    if args.compare:
+        results = compare(args.compare, args)
+    else:
+        results = run_suite(REPO_ROOT, args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
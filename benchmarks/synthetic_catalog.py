@@ -0,0 +1,176 @@
+"""Seeded generator of Polyvore-shaped synthetic catalogs
+
+    python -m benchmarks.synthetic_catalog --items 100000 --snapshot synthetic.snap
+"""
+import argparse
+import io
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+# Category mix and per-category subcategories, mirroring WardrobeRecommender.categories
+CATEGORIES = {
+    'tops': (0.30, ['shirt', 'blouse', 't-shirt', 'sweater', 'jacket']),
+    'bottoms': (0.25, ['pants', 'jeans', 'skirt', 'shorts']),
+    'shoes': (0.20, ['sneakers', 'heels', 'boots', 'flats']),
+    'dresses': (0.15, ['dress', 'gown', 'jumpsuit']),
+    'accessories': (0.10, ['bag', 'jewelry', 'belt', 'scarf'])
+}
+# Log-normal price parameters (mean of log price, sigma) per category
+PRICES = {
+    'tops': (3.6, 0.55),
+    'bottoms': (3.9, 0.5),
+    'shoes': (4.2, 0.55),
+    'dresses': (4.4, 0.6),
+    'accessories': (3.5, 0.8)
+}
+COLORS = {
+    'Black': 0.22, 'White': 0.15, 'Blue': 0.14, 'Gray': 0.08, 'Brown': 0.07,
+    'Beige': 0.06, 'Red': 0.06, 'Pink': 0.05, 'Green': 0.05, 'Navy': 0.04,
+    'Purple': 0.03, 'Yellow': 0.03, 'Orange': 0.02
+}
+# Style tags with the probability that an item carries each
+STYLE_TAGS = {
+    'Casual': 0.35, 'Comfortable': 0.25, 'Classic': 0.22, 'Trendy': 0.2,
+    'Formal': 0.15, 'Elegant': 0.15, 'Stylish': 0.15, 'Professional': 0.1,
+    'Streetwear': 0.08, 'Romantic': 0.07, 'Bold': 0.06, 'Conservative': 0.04
+}
+ADJECTIVES = ['Classic', 'Slim', 'Relaxed', 'Cropped', 'Oversized', 'Tailored', 'Soft', 'Vintage']
+MATERIALS = ['cotton', 'silk', 'denim', 'leather', 'wool', 'linen', 'suede', 'knit']
+
+
+def generate_columns(num_items: int, seed: int = 0) -> Dict[str, Any]:
+    """Draw the raw columns of a synthetic catalog"""
+    rng = np.random.default_rng(seed)
+    category_names = list(CATEGORIES)
+    category = rng.choice(
+        len(category_names), size=num_items,
+        p=np.array([CATEGORIES[name][0] for name in category_names])
+    )
+    mu = np.array([PRICES[name][0] for name in category_names])[category]
+    sigma = np.array([PRICES[name][1] for name in category_names])[category]
+    price = np.round(rng.lognormal(mu, sigma), 2)
+
+    color_names = list(COLORS)
+    color_weights = np.array(list(COLORS.values()))
+    color = rng.choice(len(color_names), size=num_items, p=color_weights / color_weights.sum())
+
+    tag_names = list(STYLE_TAGS)
+    tag_bits = rng.random((num_items, len(tag_names))) < np.array(list(STYLE_TAGS.values()))
+    # Every item carries at least one tag
+    untagged = ~tag_bits.any(axis=1)
+    tag_bits[untagged, rng.integers(0, len(tag_names), untagged.sum())] = True
+
+    subcategory = rng.integers(0, 1 << 16, num_items)
+    adjective = rng.integers(0, len(ADJECTIVES), num_items)
+    material = rng.integers(0, len(MATERIALS), num_items)
+    return {
+        'category_names': category_names,
+        'color_names': color_names,
+        'tag_names': tag_names,
+        'category': category,
+        'price': price,
+        'color': color,
+        'tag_bits': tag_bits,
+        'subcategory': subcategory,
+        'adjective': adjective,
+        'material': material
+    }
+
+
+def _texts(columns: Dict[str, Any], pos: int):
+    category = columns['category_names'][columns['category'][pos]]
+    subcategories = CATEGORIES[category][1]
+    subcategory = subcategories[columns['subcategory'][pos] % len(subcategories)]
+    color = columns['color_names'][columns['color'][pos]]
+    adjective = ADJECTIVES[columns['adjective'][pos]]
+    material = MATERIALS[columns['material'][pos]]
+    name = f"{adjective} {color} {subcategory.title()}"
+    description = f"{adjective.lower()} {material} {subcategory} in {color.lower()}"
+    return name, description
+
+
+def generate_rows(
+    num_items: int,
+    seed: int = 0,
+    image_fraction: float = 0.0,
+    image_size: int = 64
+) -> Iterator[Dict[str, Any]]:
+    """Yield Polyvore-shaped row dicts; a fraction of them carry small PNG images"""
+    columns = generate_columns(num_items, seed)
+    image_rng = np.random.default_rng(seed + 1)
+    for pos in range(num_items):
+        name, description = _texts(columns, pos)
+        row = {
+            'id': f'syn{pos}',
+            'name': name,
+            'category': columns['category_names'][columns['category'][pos]],
+            'price': float(columns['price'][pos]),
+            'color': columns['color_names'][columns['color'][pos]],
+            'style_tags': [
+                tag for tag, present in zip(columns['tag_names'], columns['tag_bits'][pos]) if present
+            ],
+            'image_url': f'https://example.com/images/syn{pos}.png',
+            'purchase_link': f'https://example.com/items/syn{pos}',
+            'description': description
+        }
+        if image_fraction and image_rng.random() < image_fraction:
+            row['image'] = _random_png(image_rng, image_size)
+        yield row
+
+
+def generate_catalog(num_items: int, seed: int = 0):
+    """Build a synthetic Catalog directly from generated columns, without row dicts"""
+    # Imported here so row generation also works against trees without catalog.py
+    from catalog import Catalog, StringColumn, StringTable
+
+    columns = generate_columns(num_items, seed)
+    texts = [_texts(columns, pos) for pos in range(num_items)]
+    ids = [f'syn{pos}' for pos in range(num_items)]
+
+    def text_column(values: List[str]):
+        return StringColumn(*StringColumn.encode(values))
+
+    style_mask = np.zeros((num_items, 1), dtype=np.uint64)
+    for code in range(len(columns['tag_names'])):
+        style_mask[columns['tag_bits'][:, code], 0] |= np.uint64(1) << np.uint64(code)
+
+    return Catalog(
+        ids=text_column(ids),
+        names=text_column([name for name, _ in texts]),
+        descriptions=text_column([description for _, description in texts]),
+        purchase_links=text_column([f'https://example.com/items/{item_id}' for item_id in ids]),
+        image_urls=text_column([f'https://example.com/images/{item_id}.png' for item_id in ids]),
+        price=columns['price'].astype(np.float64),
+        category=columns['category'].astype(np.int32),
+        color=columns['color'].astype(np.int32),
+        style_mask=style_mask,
+        categories=StringTable(columns['category_names']),
+        colors=StringTable(columns['color_names']),
+        tags=StringTable(columns['tag_names'])
+    )
+
+
+def _random_png(rng: np.random.Generator, size: int) -> bytes:
+    from PIL import Image
+    pixels = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic catalog snapshot")
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--snapshot', required=True, help="Output snapshot path")
+    args = parser.parse_args()
+
+    from snapshot import write_snapshot
+    catalog = generate_catalog(args.items, args.seed)
+    size = write_snapshot(args.snapshot, catalog)
+    print(f"Wrote {len(catalog)} synthetic items ({size} bytes) to {args.snapshot}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import numpy as np
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from catalog import Catalog
+
+
+class Bitmap:
+    """Compressed set of item positions
+
+    Sparse sets are kept as a sorted int32 position array and dense sets as a
+    packed uint64 bitset, whichever is smaller, so set operations on rare tags
+    cost time proportional to the number of matching items.
+    """
+
+    __slots__ = ('size', 'positions', 'words')
+
+    def __init__(self, size: int, positions: Optional[np.ndarray] = None, words: Optional[np.ndarray] = None):
+        self.size = size
+        self.positions = positions
+        self.words = words
+
+    @classmethod
+    def from_positions(cls, positions: np.ndarray, size: int) -> 'Bitmap':
+        positions = np.asarray(positions, dtype=np.int32)
+        # A position array costs 32 bits per item, a bitset 1 bit per catalog slot
+        if len(positions) * 32 < size:
+            return cls(size, positions=positions)
+        words = np.zeros(_num_words(size), dtype=np.uint64)
+        np.bitwise_or.at(words, positions >> 6, np.left_shift(np.uint64(1), (positions & 63).astype(np.uint64)))
+        return cls(size, words=words)
+
+    @classmethod
+    def empty(cls, size: int) -> 'Bitmap':
+        return cls(size, positions=np.empty(0, dtype=np.int32))
+
+    @property
+    def is_dense(self) -> bool:
+        return self.words is not None
+
+    def to_positions(self) -> np.ndarray:
+        """Sorted int32 array of the positions in this set"""
+        if not self.is_dense:
+            return self.positions
+        bits = np.unpackbits(self.words.view(np.uint8), bitorder='little')
+        return np.flatnonzero(bits[:self.size]).astype(np.int32)
+
+    def __len__(self) -> int:
+        if not self.is_dense:
+            return len(self.positions)
+        return int(np.unpackbits(self.words.view(np.uint8)).sum())
+
+    def __contains__(self, pos: int) -> bool:
+        if not self.is_dense:
+            i = np.searchsorted(self.positions, pos)
+            return bool(i < len(self.positions) and self.positions[i] == pos)
+        return bool((int(self.words[pos >> 6]) >> (pos & 63)) & 1)
+
+    def _test(self, positions: np.ndarray) -> np.ndarray:
+        """Boolean array telling which of the given positions are in this dense set"""
+        return ((self.words[positions >> 6] >> (positions & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        if not self.is_dense and not other.is_dense:
+            return Bitmap.from_positions(np.union1d(self.positions, other.positions), self.size)
+        if self.is_dense and other.is_dense:
+            return Bitmap(self.size, words=self.words | other.words)
+        dense, sparse = (self, other) if self.is_dense else (other, self)
+        result = Bitmap.from_positions(sparse.positions, self.size)
+        if result.is_dense:
+            return Bitmap(self.size, words=result.words | dense.words)
+        words = dense.words.copy()
+        np.bitwise_or.at(
+            words, sparse.positions >> 6,
+            np.left_shift(np.uint64(1), (sparse.positions & 63).astype(np.uint64))
+        )
+        return Bitmap(self.size, words=words)
+
+    def with_changes(
+        self,
+        size: int,
+        added: Optional[np.ndarray] = None,
+        removed: Optional[np.ndarray] = None
+    ) -> 'Bitmap':
+        """Copy of this set resized to size, with positions added and removed
+
+        Leaves self untouched; unchanged dense words are shared when the word
+        count stays the same.
+        """
+        if not self.is_dense:
+            positions = self.positions
+            if removed is not None and len(removed):
+                positions = positions[~np.isin(positions, removed)]
+            if added is not None and len(added):
+                positions = np.union1d(positions, np.asarray(added, dtype=np.int32))
+            return Bitmap.from_positions(positions, size)
+
+        words = self.words
+        num_words = _num_words(size)
+        if len(words) != num_words:
+            words = np.concatenate([words[:num_words], np.zeros(max(0, num_words - len(words)), dtype=np.uint64)])
+        elif (added is not None and len(added)) or (removed is not None and len(removed)):
+            words = words.copy()
+        if removed is not None and len(removed):
+            removed = np.asarray(removed, dtype=np.int64)
+            np.bitwise_and.at(words, removed >> 6, ~np.left_shift(np.uint64(1), (removed & 63).astype(np.uint64)))
+        if added is not None and len(added):
+            added = np.asarray(added, dtype=np.int64)
+            np.bitwise_or.at(words, added >> 6, np.left_shift(np.uint64(1), (added & 63).astype(np.uint64)))
+        return Bitmap(size, words=words)
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        if not self.is_dense and not other.is_dense:
+            return Bitmap(self.size, positions=np.intersect1d(self.positions, other.positions, assume_unique=True))
+        if self.is_dense and other.is_dense:
+            words = self.words & other.words
+            return Bitmap.from_positions(Bitmap(self.size, words=words).to_positions(), self.size)
+        dense, sparse = (self, other) if self.is_dense else (other, self)
+        return Bitmap(self.size, positions=sparse.positions[dense._test(sparse.positions)])
+
+
+class BitmapIndex:
+    """Inverted index from style tags, colors and categories to item bitmaps
+
+    Built once per catalog; candidate selection is then a few bitmap unions and
+    intersections instead of a scan over every item.
+    """
+
+    def __init__(self, size: int, bitmaps: Dict[Tuple[str, str], Bitmap]):
+        self.size = size
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def from_catalog(cls, catalog: Catalog) -> 'BitmapIndex':
+        size = len(catalog)
+        bitmaps = {}
+        for kind, table, codes in (
+            ('category', catalog.categories, catalog.category),
+            ('color', catalog.colors, catalog.color)
+        ):
+            for code, positions in _group_positions(codes, len(table)):
+                bitmaps[(kind, table[code])] = Bitmap.from_positions(positions, size)
+
+        # Unpack the tag bitmask into (row, tag) pairs and group them by tag
+        bits = np.unpackbits(
+            np.ascontiguousarray(catalog.style_mask).view(np.uint8), axis=1, bitorder='little'
+        )
+        rows, tag_codes = np.nonzero(bits[:, :len(catalog.tags)])
+        order = np.argsort(tag_codes, kind='stable')
+        for code, positions in _group_positions(tag_codes[order], len(catalog.tags), rows[order]):
+            bitmaps[('tag', catalog.tags[code])] = Bitmap.from_positions(positions, size)
+        return cls(size, bitmaps)
+
+    def updated(
+        self,
+        size: int,
+        added: Dict[Tuple[str, str], np.ndarray],
+        removed: Dict[Tuple[str, str], np.ndarray]
+    ) -> 'BitmapIndex':
+        """New index over size positions with the given per-key changes applied
+
+        Only bitmaps that change (or dense bitmaps whose word count grows) are
+        copied; the receiving index is left untouched for readers still using it.
+        """
+        bitmaps = {}
+        for key in set(self.bitmaps) | set(added):
+            bitmap = self.bitmaps.get(key)
+            if bitmap is None:
+                bitmap = Bitmap.empty(size)
+            if key in added or key in removed or bitmap.size != size:
+                bitmap = bitmap.with_changes(size, added.get(key), removed.get(key))
+            bitmaps[key] = bitmap
+        return BitmapIndex(size, bitmaps)
+
+    def get(self, kind: str, value: str) -> Bitmap:
+        bitmap = self.bitmaps.get((kind, value))
+        return Bitmap.empty(self.size) if bitmap is None else bitmap
+
+    def any_of(self, kind: str, values: Iterable[str]) -> Bitmap:
+        """Union of the bitmaps for the given values"""
+        result = Bitmap.empty(self.size)
+        for value in values:
+            bitmap = self.bitmaps.get((kind, value))
+            if bitmap is not None:
+                result = result | bitmap
+        return result
+
+    def preference_bitmap(
+        self,
+        occasion_styles: Optional[List[str]],
+        preferences: Optional[Dict[str, Any]]
+    ) -> Optional[Bitmap]:
+        """Items matching the occasion styles and color/style preferences
+
+        Returns None when no constraint applies, meaning every item matches.
+        """
+        constraints = []
+        if occasion_styles is not None:
+            constraints.append(self.any_of('tag', occasion_styles))
+        if preferences:
+            if preferences.get('colors'):
+                constraints.append(self.any_of('color', preferences['colors']))
+            if preferences.get('styles'):
+                constraints.append(self.any_of('tag', preferences['styles']))
+        if not constraints:
+            return None
+        # Intersect smallest first so every step is bounded by the rarest constraint
+        constraints.sort(key=len)
+        result = constraints[0]
+        for bitmap in constraints[1:]:
+            result = result & bitmap
+        return result
+
+    def candidates(
+        self,
+        occasion_styles: Optional[List[str]],
+        preferences: Optional[Dict[str, Any]]
+    ) -> np.ndarray:
+        """Sorted positions of items matching the occasion styles and preferences"""
+        bitmap = self.preference_bitmap(occasion_styles, preferences)
+        if bitmap is None:
+            return np.arange(self.size, dtype=np.int32)
+        return bitmap.to_positions()
+
+
+def _group_positions(codes: np.ndarray, num_codes: int, positions: Optional[np.ndarray] = None):
+    """Yield (code, positions) for each code present; codes must be sorted if positions is given"""
+    if positions is None:
+        positions = np.argsort(codes, kind='stable')
+        codes = codes[positions]
+    valid = codes >= 0
+    codes, positions = codes[valid], positions[valid]
+    bounds = np.searchsorted(codes, np.arange(num_codes + 1))
+    for code in range(num_codes):
+        start, end = bounds[code], bounds[code + 1]
+        if end > start:
+            yield code, np.sort(positions[start:end])
+
+
+def _num_words(size: int) -> int:
+    return max(1, (size + 63) // 64)
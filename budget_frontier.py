@@ -0,0 +1,226 @@
+"""Precomputed budget sweeps for requests without a style profile
+
+For one occasion and preference signature, the composer is run once at every
+budget of the app's grid ($50 to $1000 in $50 steps) with fixed per-item
+scores. The distinct outfits it picks form the signature's frontier: complete
+outfits sorted by total price, each with its score and its most expensive
+item. Any budget is then answered by bisecting the total prices, dropping
+outfits with an item over the per-item share and taking the best-scoring
+ones with distinct (top, bottom) pairs, as the composer would. Because the
+frontier at a grid budget contains the composer's own picks there, the
+answer is never worse than live composition over the same scores.
+
+Frontiers are tied to the catalog they were built from by a fingerprint of
+its columns, and stored together in one compressed .npz file:
+
+    python budget_frontier.py build catalog.snap frontiers.npz
+    python budget_frontier.py info frontiers.npz
+"""
+import argparse
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from catalog import Catalog
+from composer import OUTFIT_CATEGORIES, CategoryCandidates, compose_outfits
+
+BUDGET_GRID = tuple(range(50, 1001, 50))
+# Most recommendations a frontier answers for; larger requests are composed live
+FRONTIER_DEPTH = 10
+
+
+@dataclass
+class BudgetFrontier:
+    """Outfits picked across a budget sweep, sorted by total price"""
+    positions: np.ndarray  # (m, 3) catalog positions in OUTFIT_CATEGORIES order
+    prices: np.ndarray     # total price of each outfit
+    max_item: np.ndarray   # price of each outfit's most expensive item
+    scores: np.ndarray
+    min_budget: float
+    max_budget: float
+    depth: int
+
+    def outfits(self, budget: float, num_outfits: int, item_share: float) -> Optional[List[Tuple[Tuple, float, float]]]:
+        """compose_outfits-style results for budget, or None when the frontier does not cover the request
+
+        The frontier only holds the composer's picks at the grid budgets, so
+        when fewer than num_outfits of them fit, live composition may still
+        find more; that also returns None rather than a short answer.
+        """
+        if not self.min_budget <= budget <= self.max_budget or num_outfits > self.depth:
+            return None
+        end = int(np.searchsorted(self.prices, budget, side='right'))
+        eligible = np.flatnonzero(self.max_item[:end] <= budget * item_share)
+        if len(eligible) < num_outfits:
+            return None
+        eligible = eligible[np.argsort(-self.scores[eligible], kind='stable')]
+        # One outfit per (top, bottom) pair, keeping its best-scoring one
+        _, first = np.unique(self.positions[eligible, :2], axis=0, return_index=True)
+        chosen = eligible[np.sort(first)][:num_outfits]
+        if len(chosen) < num_outfits:
+            return None
+        return [
+            (tuple(int(pos) for pos in self.positions[i]), float(self.prices[i]), float(self.scores[i]))
+            for i in chosen
+        ]
+
+
+class FrontierStore:
+    """Frontiers of one catalog keyed by (occasion, colors, styles) signature"""
+
+    def __init__(self, fingerprint: str, frontiers: Dict[tuple, BudgetFrontier] = None):
+        self.fingerprint = fingerprint
+        self.frontiers = frontiers or {}
+
+    def get(self, signature: tuple) -> Optional[BudgetFrontier]:
+        return self.frontiers.get(signature)
+
+    def __len__(self) -> int:
+        return len(self.frontiers)
+
+    def save(self, path: str):
+        arrays, signatures = {}, []
+        for i, (signature, frontier) in enumerate(self.frontiers.items()):
+            occasion, colors, styles = signature
+            signatures.append({
+                'occasion': occasion, 'colors': list(colors), 'styles': list(styles),
+                'min_budget': frontier.min_budget, 'max_budget': frontier.max_budget, 'depth': frontier.depth
+            })
+            arrays[f'{i}.positions'] = frontier.positions.astype(np.int32)
+            arrays[f'{i}.prices'] = frontier.prices
+            arrays[f'{i}.max_item'] = frontier.max_item
+            arrays[f'{i}.scores'] = frontier.scores
+        header = {'fingerprint': self.fingerprint, 'signatures': signatures}
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, header=np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'FrontierStore':
+        with np.load(path) as data:
+            header = json.loads(data['header'].tobytes().decode('utf-8'))
+            frontiers = {}
+            for i, entry in enumerate(header['signatures']):
+                signature = (entry['occasion'], tuple(entry['colors']), tuple(entry['styles']))
+                frontiers[signature] = BudgetFrontier(
+                    positions=data[f'{i}.positions'].astype(np.int64),
+                    prices=data[f'{i}.prices'],
+                    max_item=data[f'{i}.max_item'],
+                    scores=data[f'{i}.scores'],
+                    min_budget=entry['min_budget'],
+                    max_budget=entry['max_budget'],
+                    depth=entry['depth']
+                )
+        return cls(header['fingerprint'], frontiers)
+
+
+def catalog_fingerprint(catalog: Catalog) -> str:
+    """Digest of the columns a frontier depends on"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(catalog)).encode('utf-8'))
+    for column in (catalog.price, catalog.category, catalog.color, catalog.style_mask):
+        digest.update(np.ascontiguousarray(column).tobytes())
+    for table in (catalog.categories, catalog.colors, catalog.tags):
+        digest.update('\x00'.join(table).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def item_scores(catalog: Catalog, seed: int = 0) -> np.ndarray:
+    """Fixed per-item tie-breaking scores used instead of per-request random ones"""
+    return np.random.default_rng(seed).random(len(catalog))
+
+
+def build_frontier(
+    recommender,
+    signature: tuple,
+    scores: np.ndarray,
+    budgets: Sequence[float] = BUDGET_GRID,
+    depth: int = FRONTIER_DEPTH
+) -> BudgetFrontier:
+    """Sweep the composer over budgets for one signature of the recommender's catalog"""
+    occasion, colors, styles = signature
+    catalog = recommender.catalog
+    occasion_styles = recommender.occasion_styles.get(occasion, ['Casual'])
+    candidates = recommender.index.candidates(occasion_styles, {'colors': list(colors), 'styles': list(styles)})
+    by_category = recommender._split_by_category(candidates)
+
+    picked: Dict[Tuple[int, int, int], float] = {}
+    for budget in budgets:
+        groups = [
+            CategoryCandidates(
+                positions, catalog.price[positions], scores[positions],
+                recommender._compatibility_keys(positions), catalog.color[positions]
+            )
+            for positions in recommender._cap_prices(by_category, budget)
+        ]
+        harmony = recommender._get_color_harmony()
+        for outfit, _, score in compose_outfits(
+            *groups, budget, depth, beam=recommender.composer_beam,
+            compatibility=recommender.compatibility, harmony=harmony
+        ):
+            picked[tuple(int(pos) for pos in outfit)] = score
+
+    positions = np.array(list(picked), dtype=np.int64).reshape(-1, len(OUTFIT_CATEGORIES))
+    item_prices = catalog.price[positions]
+    prices = item_prices.sum(axis=1)
+    order = np.argsort(prices, kind='stable')
+    return BudgetFrontier(
+        positions=positions[order],
+        prices=prices[order],
+        max_item=item_prices.max(axis=1)[order] if len(positions) else np.empty(0),
+        scores=np.array(list(picked.values()), dtype=np.float64)[order],
+        min_budget=float(min(budgets)),
+        max_budget=float(max(budgets)),
+        depth=depth
+    )
+
+
+def build_frontiers(
+    recommender,
+    signatures: Optional[Sequence[tuple]] = None,
+    budgets: Sequence[float] = BUDGET_GRID,
+    depth: int = FRONTIER_DEPTH,
+    seed: int = 0
+) -> FrontierStore:
+    """Frontiers for the given signatures, by default every occasion without color or style preferences"""
+    if signatures is None:
+        signatures = [(occasion, (), ()) for occasion in recommender.occasion_styles]
+    scores = item_scores(recommender.catalog, seed)
+    store = FrontierStore(catalog_fingerprint(recommender.catalog))
+    for signature in signatures:
+        store.frontiers[signature] = build_frontier(recommender, signature, scores, budgets, depth)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect precomputed budget frontiers")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help="Build frontiers for a catalog snapshot")
+    build_parser.add_argument('snapshot', help="Catalog snapshot file")
+    build_parser.add_argument('path', help="Output .npz file")
+    build_parser.add_argument('--depth', type=int, default=FRONTIER_DEPTH)
+    build_parser.add_argument('--seed', type=int, default=0)
+    info_parser = subparsers.add_parser('info', help="Print a frontier file's summary")
+    info_parser.add_argument('path', help="Frontier .npz file")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        from WardrobeRecommender import WardrobeRecommender
+        recommender = WardrobeRecommender.from_snapshot(args.snapshot)
+        store = build_frontiers(recommender, depth=args.depth, seed=args.seed)
+        store.save(args.path)
+        print(f"Wrote {len(store)} frontiers to {args.path}")
+    else:
+        store = FrontierStore.load(args.path)
+        print(f"{args.path}: catalog {store.fingerprint}")
+        for (occasion, colors, styles), frontier in store.frontiers.items():
+            print(
+                f"  {occasion} colors={list(colors)} styles={list(styles)}: {len(frontier.prices)} outfits, "
+                f"${frontier.min_budget:.0f}-${frontier.max_budget:.0f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
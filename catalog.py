@@ -0,0 +1,450 @@
+import numpy as np
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+
+
+class StringTable:
+    """Interned string vocabulary mapping each distinct value to a dense integer code"""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> int:
+        """Return the code for value, or -1 if it was never interned"""
+        return self.codes.get(value, -1)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class StringColumn:
+    """Read-only sequence of optional strings stored as UTF-8 bytes plus offsets
+
+    Used for text columns opened from a snapshot so they can be served straight
+    from a memory-mapped buffer; values are decoded only when accessed.
+    """
+
+    def __init__(self, offsets: np.ndarray, data, valid: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+        self.valid = valid
+
+    @classmethod
+    def encode(cls, values: Sequence[Optional[str]]):
+        """Encode values into (offsets, data bytes, valid mask) arrays"""
+        encoded = [b'' if value is None else str(value).encode('utf-8') for value in values]
+        lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        valid = np.fromiter((value is not None for value in values), dtype=bool, count=len(encoded))
+        return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8), valid
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def __getitem__(self, pos: int) -> Optional[str]:
+        if not self.valid[pos]:
+            return None
+        return bytes(self.data[self.offsets[pos]:self.offsets[pos + 1]]).decode('utf-8')
+
+    def __iter__(self):
+        return (self[pos] for pos in range(len(self)))
+
+
+class AppendedColumn:
+    """Read-only column made of a base column followed by appended values
+
+    Lets an updated catalog reuse a large (possibly memory-mapped) column and
+    store only the values added since. A None base reads as all-None.
+    """
+
+    def __init__(self, base: Optional[Sequence], base_length: int, extra: tuple):
+        self.base = base
+        self.base_length = base_length
+        self.extra = extra
+
+    @classmethod
+    def extend(cls, column: Optional[Sequence], length: int, values: Iterable) -> 'AppendedColumn':
+        """column (of the given length) followed by values, without nesting appended columns"""
+        if isinstance(column, AppendedColumn):
+            return cls(column.base, column.base_length, column.extra + tuple(values))
+        return cls(column, length, tuple(values))
+
+    def __len__(self) -> int:
+        return self.base_length + len(self.extra)
+
+    def __getitem__(self, pos: int):
+        pos = int(pos)
+        if pos >= self.base_length:
+            return self.extra[pos - self.base_length]
+        return None if self.base is None else self.base[pos]
+
+    def __iter__(self):
+        return (self[pos] for pos in range(len(self)))
+
+
+class TakenColumn:
+    """Read-only view of a column at a subset of its positions"""
+
+    def __init__(self, base: Sequence, positions: np.ndarray):
+        self.base = base
+        self.positions = positions
+
+    @classmethod
+    def take(cls, column: Optional[Sequence], positions: np.ndarray) -> Optional['TakenColumn']:
+        if column is None:
+            return None
+        if isinstance(column, TakenColumn):
+            return cls(column.base, column.positions[positions])
+        return cls(column, positions)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, pos: int):
+        return self.base[int(self.positions[pos])]
+
+    def __iter__(self):
+        return (self[pos] for pos in range(len(self)))
+
+
+class Catalog:
+    """Columnar view of the item catalog used by the vectorized recommendation path
+
+    Prices, categories and colors are stored as NumPy arrays (categories and colors
+    as integer codes into a StringTable) and style tags as a packed bitmask with one
+    bit per interned tag, so catalog-wide filters are a handful of array operations.
+    """
+
+    # Fields read from each catalog row, in the order used by from_rows
+    TEXT_FIELDS = ('id', 'name', 'description', 'purchase_link', 'image_url')
+
+    def __init__(
+        self,
+        ids: Sequence,
+        names: Sequence,
+        descriptions: Sequence,
+        purchase_links: Sequence,
+        image_urls: Sequence,
+        price: np.ndarray,
+        category: np.ndarray,
+        color: np.ndarray,
+        style_mask: np.ndarray,
+        categories: StringTable,
+        colors: StringTable,
+        tags: StringTable,
+        images: Optional[Sequence] = None,
+        thumbnails: Optional[Sequence] = None,
+        thumbnail_size: Optional[Tuple[int, int]] = None,
+        removed: Optional[np.ndarray] = None
+    ):
+        self.ids = ids
+        self.names = names
+        self.descriptions = descriptions
+        self.purchase_links = purchase_links
+        self.image_urls = image_urls
+        self.price = price
+        self.category = category
+        self.color = color
+        self.style_mask = style_mask
+        self.categories = categories
+        self.colors = colors
+        self.tags = tags
+        self.images = images
+        # Optional base64 JPEG thumbnails rendered ahead of time at thumbnail_size
+        self.thumbnails = thumbnails
+        self.thumbnail_size = tuple(thumbnail_size) if thumbnail_size else None
+        # Tombstones left by incremental removals; removed items are priced at inf
+        self.removed = removed
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Dict[str, Any]],
+        images: Optional[Sequence] = None,
+        compact: bool = False,
+        tables: Optional[Tuple[StringTable, StringTable, StringTable]] = None
+    ) -> 'Catalog':
+        """Build a catalog from an iterable of row dicts (Polyvore rows or sample items)
+
+        With compact=True the text columns are packed into StringColumns
+        instead of lists of Python strings. tables optionally supplies the
+        (categories, colors, tags) vocabularies to intern into.
+        """
+        text_columns = {field: [] for field in cls.TEXT_FIELDS}
+        prices, category_codes, color_codes, row_tags = [], [], [], []
+        categories, colors, tags = tables or (StringTable(), StringTable(), StringTable())
+
+        for row in rows:
+            for field in cls.TEXT_FIELDS:
+                text_columns[field].append(row.get(field))
+            price = row.get('price')
+            prices.append(float('inf') if price is None else float(price))
+            category_codes.append(categories.intern((row.get('category') or '').lower()))
+            color = row.get('color')
+            color_codes.append(-1 if color is None else colors.intern(color))
+            row_tags.append([tags.intern(tag) for tag in (row.get('style_tags') or [])])
+
+        if compact:
+            text_columns = {
+                field: StringColumn(*StringColumn.encode(values)) for field, values in text_columns.items()
+            }
+
+        return cls(
+            ids=text_columns['id'],
+            names=text_columns['name'],
+            descriptions=text_columns['description'],
+            purchase_links=text_columns['purchase_link'],
+            image_urls=text_columns['image_url'],
+            price=np.asarray(prices, dtype=np.float64),
+            category=np.asarray(category_codes, dtype=np.int32),
+            color=np.asarray(color_codes, dtype=np.int32),
+            style_mask=pack_tag_codes(row_tags, len(tags)),
+            categories=categories,
+            colors=colors,
+            tags=tags,
+            images=images
+        )
+
+    @classmethod
+    def from_dataset(cls, dataset) -> 'Catalog':
+        """Build a catalog from a Hugging Face dataset, reading whole columns at a time
+
+        Images are not decoded here; they stay in the dataset and are fetched by
+        position only for items that end up in an outfit.
+        """
+        column_names = getattr(dataset, 'column_names', None)
+        if column_names is None:
+            return cls.from_rows(dataset)
+
+        fields = cls.TEXT_FIELDS + ('price', 'category', 'color', 'style_tags')
+        columns = {
+            field: dataset[field] if field in column_names else [None] * len(dataset)
+            for field in fields
+        }
+        rows = (
+            {field: columns[field][i] for field in fields}
+            for i in range(len(dataset))
+        )
+        images = _DatasetImages(dataset) if 'image' in column_names else None
+        return cls.from_rows(rows, images=images, compact=True)
+
+    def __len__(self) -> int:
+        return len(self.price)
+
+    def num_live(self) -> int:
+        """Number of items not removed by an incremental update"""
+        return len(self) if self.removed is None else len(self) - int(self.removed.sum())
+
+    def take(self, positions: np.ndarray) -> 'Catalog':
+        """Catalog of the items at positions, in that order
+
+        Numeric columns are copied; text and image columns become lazy views.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        return Catalog(
+            ids=TakenColumn.take(self.ids, positions),
+            names=TakenColumn.take(self.names, positions),
+            descriptions=TakenColumn.take(self.descriptions, positions),
+            purchase_links=TakenColumn.take(self.purchase_links, positions),
+            image_urls=TakenColumn.take(self.image_urls, positions),
+            price=self.price[positions],
+            category=self.category[positions],
+            color=self.color[positions],
+            style_mask=self.style_mask[positions],
+            categories=self.categories,
+            colors=self.colors,
+            tags=self.tags,
+            images=TakenColumn.take(self.images, positions),
+            thumbnails=TakenColumn.take(self.thumbnails, positions),
+            thumbnail_size=self.thumbnail_size,
+            removed=None if self.removed is None else self.removed[positions]
+        )
+
+    def tag_query(self, tags: Iterable[str]) -> np.ndarray:
+        """Pack a list of tag names into a bitmask row matching style_mask's layout"""
+        query = np.zeros(self.style_mask.shape[1], dtype=np.uint64)
+        for tag in tags:
+            code = self.tags.code(tag)
+            if code >= 0:
+                query[code >> 6] |= np.uint64(1) << np.uint64(code & 63)
+        return query
+
+    def has_any_tag(self, tags: Iterable[str]) -> np.ndarray:
+        """Boolean mask of items carrying at least one of the given style tags"""
+        query = self.tag_query(tags)
+        return (self.style_mask & query).any(axis=1)
+
+    def has_color(self, colors: Iterable[str]) -> np.ndarray:
+        """Boolean mask of items whose color is one of the given colors"""
+        codes = [code for code in (self.colors.code(c) for c in colors) if code >= 0]
+        return np.isin(self.color, codes)
+
+    def in_category(self, category: str) -> np.ndarray:
+        """Boolean mask of items in the given (lowercase) category"""
+        return self.category == self.categories.code(category)
+
+    def style_tags(self, pos: int) -> List[str]:
+        """Decode the style tags of the item at pos"""
+        tags = []
+        for word_index, word in enumerate(self.style_mask[pos]):
+            word = int(word)
+            while word:
+                low_bit = word & -word
+                tags.append(self.tags[(word_index << 6) + low_bit.bit_length() - 1])
+                word ^= low_bit
+        return tags
+
+    def image(self, pos: int):
+        """Raw image payload for the item at pos, or None"""
+        if self.images is None:
+            return None
+        return self.images[pos]
+
+    def item(self, pos: int) -> 'ItemView':
+        """Lightweight attribute view of the item at pos"""
+        return ItemView(self, pos)
+
+    def items(self) -> Iterable['ItemView']:
+        return (ItemView(self, pos) for pos in range(len(self)))
+
+    def row(self, pos: int) -> Dict[str, Any]:
+        """Materialize the item at pos as a row dict"""
+        color_code = int(self.color[pos])
+        price = float(self.price[pos])
+        return {
+            'id': self.ids[pos],
+            'name': self.names[pos],
+            'category': self.categories[int(self.category[pos])],
+            'price': None if price == float('inf') else price,
+            'color': None if color_code < 0 else self.colors[color_code],
+            'style_tags': self.style_tags(pos),
+            'image_url': self.image_urls[pos],
+            'purchase_link': self.purchase_links[pos],
+            'description': self.descriptions[pos]
+        }
+
+
+class ItemView:
+    """Read-only item record backed by one catalog position
+
+    Has the same attributes as FashionItem but stores only the catalog and the
+    position; fields are read from the shared arrays when accessed, so millions
+    of views cost two slots each instead of a dict of strings and lists.
+    """
+
+    __slots__ = ('catalog', 'pos')
+
+    def __init__(self, catalog: Catalog, pos: int):
+        self.catalog = catalog
+        self.pos = int(pos)
+
+    @property
+    def id(self) -> Optional[str]:
+        return self.catalog.ids[self.pos]
+
+    @property
+    def name(self) -> Optional[str]:
+        return self.catalog.names[self.pos]
+
+    @property
+    def category(self) -> str:
+        return self.catalog.categories[int(self.catalog.category[self.pos])]
+
+    @property
+    def price(self) -> Optional[float]:
+        price = float(self.catalog.price[self.pos])
+        return None if price == float('inf') else price
+
+    @property
+    def color(self) -> Optional[str]:
+        code = int(self.catalog.color[self.pos])
+        return None if code < 0 else self.catalog.colors[code]
+
+    @property
+    def style_tags(self) -> List[str]:
+        return self.catalog.style_tags(self.pos)
+
+    @property
+    def style_bits(self) -> np.ndarray:
+        """The item's packed tag bitmask row"""
+        return self.catalog.style_mask[self.pos]
+
+    @property
+    def image_url(self) -> Optional[str]:
+        return self.catalog.image_urls[self.pos]
+
+    @property
+    def purchase_link(self) -> Optional[str]:
+        return self.catalog.purchase_links[self.pos]
+
+    @property
+    def description(self) -> Optional[str]:
+        return self.catalog.descriptions[self.pos]
+
+    @property
+    def image_data(self):
+        # Thumbnails are rendered on demand by the recommender, never stored per item
+        return None
+
+    def has_tag(self, tag: str) -> bool:
+        code = self.catalog.tags.code(tag)
+        if code < 0:
+            return False
+        return bool(int(self.catalog.style_mask[self.pos, code >> 6]) >> (code & 63) & 1)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ItemView) and other.catalog is self.catalog and other.pos == self.pos
+
+    def __hash__(self) -> int:
+        return hash((id(self.catalog), self.pos))
+
+    def __repr__(self) -> str:
+        return f"ItemView(pos={self.pos}, id={self.id!r}, name={self.name!r})"
+
+
+class _DatasetImages:
+    """Lazy positional accessor for the image column of a Hugging Face dataset"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __getitem__(self, pos: int):
+        return self.dataset[int(pos)].get('image')
+
+    def __len__(self) -> int:
+        return len(self.dataset)
+
+
+def pack_tag_codes(row_tags: List[List[int]], num_tags: int) -> np.ndarray:
+    """Pack per-row tag code lists into an (n, words) uint64 bitmask array"""
+    words = max(1, (num_tags + 63) // 64)
+    mask = np.zeros((len(row_tags), words), dtype=np.uint64)
+    if not row_tags:
+        return mask
+    lengths = np.fromiter((len(codes) for codes in row_tags), dtype=np.int64, count=len(row_tags))
+    if lengths.sum() == 0:
+        return mask
+    rows = np.repeat(np.arange(len(row_tags)), lengths)
+    codes = np.fromiter(
+        (code for codes in row_tags for code in codes), dtype=np.uint64, count=int(lengths.sum())
+    )
+    bits = np.left_shift(np.uint64(1), codes & np.uint64(63))
+    np.bitwise_or.at(mask, (rows, (codes >> np.uint64(6)).astype(np.int64)), bits)
+    return mask
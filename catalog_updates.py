@@ -0,0 +1,273 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from bitmap_index import BitmapIndex
+from catalog import AppendedColumn, Catalog, StringTable
+from embeddings import build_item_embeddings
+
+# Removed items are compacted away once they make up this fraction of the catalog
+COMPACT_FRACTION = 0.25
+# Extra embedding rows reserved on each reallocation, as a fraction of the catalog
+EMBEDDING_HEADROOM = 0.125
+
+
+@dataclass
+class CatalogDelta:
+    """Item changes to apply to a catalog in one step
+
+    upserts are full rows keyed by 'id' (new ids are added, known ids
+    replaced), removals are ids, and prices maps ids to new prices.
+    """
+    upserts: List[Dict[str, Any]] = field(default_factory=list)
+    removals: List[str] = field(default_factory=list)
+    prices: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.upserts) + len(self.removals) + len(self.prices)
+
+
+@dataclass
+class UpdateResult:
+    catalog: Catalog
+    index: BitmapIndex
+    embeddings: Optional[np.ndarray]
+    lineage: 'CatalogLineage'
+    changed_ids: List[str]  # ids whose rows (and so thumbnails) changed or went away
+    stats: Dict[str, Any]
+
+
+class CatalogLineage:
+    """Bookkeeping shared by successive versions of one catalog
+
+    Holds the id -> position map and an over-allocated embedding buffer. Both
+    are extended in place, which is safe because a version never reads past
+    its own length; only the newest version (head) may be updated from, and an
+    update from any other version starts a fresh lineage.
+    """
+
+    def __init__(self, catalog: Catalog, embeddings: Optional[np.ndarray] = None):
+        self.head = catalog
+        removed = catalog.removed
+        self.positions: Dict[str, int] = {
+            item_id: pos for pos, item_id in enumerate(catalog.ids)
+            if item_id is not None and (removed is None or not removed[pos])
+        }
+        self.embedding_buffer = embeddings
+
+    @classmethod
+    def continue_from(
+        cls,
+        lineage: Optional['CatalogLineage'],
+        catalog: Catalog,
+        embeddings: Optional[np.ndarray]
+    ) -> 'CatalogLineage':
+        if lineage is not None and lineage.head is catalog:
+            if embeddings is not None and (
+                lineage.embedding_buffer is None
+                or not np.shares_memory(lineage.embedding_buffer[:1], embeddings[:1])
+            ):
+                lineage.embedding_buffer = embeddings
+            return lineage
+        return cls(catalog, embeddings)
+
+    def append_embeddings(self, embeddings: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """View of embeddings followed by rows, written into spare buffer capacity when possible"""
+        n, extra = len(embeddings), len(rows)
+        buffer = self.embedding_buffer
+        if buffer is None or len(buffer) < n + extra or not np.shares_memory(buffer[:1], embeddings[:1]):
+            capacity = n + extra + int(n * EMBEDDING_HEADROOM)
+            buffer = np.empty((capacity, embeddings.shape[1]), dtype=embeddings.dtype)
+            buffer[:n] = embeddings
+            self.embedding_buffer = buffer
+        buffer[n:n + extra] = rows
+        return buffer[:n + extra]
+
+
+def apply_delta(
+    catalog: Catalog,
+    index: BitmapIndex,
+    embeddings: Optional[np.ndarray],
+    delta: CatalogDelta,
+    lineage: Optional[CatalogLineage] = None,
+    compact_fraction: float = COMPACT_FRACTION
+) -> UpdateResult:
+    """Apply delta copy-on-write and return the next catalog version
+
+    The given catalog, index and embeddings are never modified, so readers
+    still holding them see a consistent snapshot. Repricing copies the price
+    column; replaced and removed items are tombstoned (priced at inf and
+    dropped from the index) and new or replaced rows are appended, so only the
+    changed bitmaps and the new embedding rows are computed.
+    """
+    start = time.perf_counter()
+    lineage = CatalogLineage.continue_from(lineage, catalog, embeddings)
+    # Detach the lineage while it is being changed, so a failed update cannot be continued from
+    lineage.head = None
+    id_positions = lineage.positions
+    n = len(catalog)
+    price = catalog.price.copy()
+    removed = catalog.removed.copy() if catalog.removed is not None else np.zeros(n, dtype=bool)
+    tombstones, changed_ids = [], []
+    missing = repriced = 0
+
+    for item_id in delta.removals:
+        pos = id_positions.pop(str(item_id), None)
+        if pos is None:
+            missing += 1
+            continue
+        tombstones.append(pos)
+        changed_ids.append(str(item_id))
+
+    for item_id, new_price in delta.prices.items():
+        pos = id_positions.get(str(item_id))
+        if pos is None:
+            missing += 1
+            continue
+        price[pos] = float('inf') if new_price is None else float(new_price)
+        repriced += 1
+
+    # Last upsert of an id wins
+    upserts = {str(row['id']): row for row in delta.upserts}
+    appended = []
+    for item_id, row in upserts.items():
+        pos = id_positions.get(item_id)
+        if pos is not None:
+            if _same_except_price(catalog, pos, row):
+                row_price = row.get('price')
+                price[pos] = float('inf') if row_price is None else float(row_price)
+                repriced += 1
+                continue
+            tombstones.append(pos)
+            changed_ids.append(item_id)
+        appended.append(row)
+
+    tombstones = np.unique(np.asarray(tombstones, dtype=np.int64))
+    price[tombstones] = float('inf')
+    removed[tombstones] = True
+
+    # Intern new values into copies of the vocabularies; older versions keep theirs
+    tables = (StringTable(catalog.categories), StringTable(catalog.colors), StringTable(catalog.tags))
+    added = Catalog.from_rows(appended, tables=tables)
+    new_size = n + len(appended)
+    style_mask = _concat_masks(catalog.style_mask, added.style_mask)
+
+    def extend(column, values):
+        return AppendedColumn.extend(column, n, values) if len(appended) else column
+
+    images = None
+    if catalog.images is not None or any(row.get('image') is not None for row in appended):
+        images = extend(catalog.images, [row.get('image') for row in appended])
+    updated = Catalog(
+        ids=extend(catalog.ids, added.ids),
+        names=extend(catalog.names, added.names),
+        descriptions=extend(catalog.descriptions, added.descriptions),
+        purchase_links=extend(catalog.purchase_links, added.purchase_links),
+        image_urls=extend(catalog.image_urls, added.image_urls),
+        price=np.concatenate([price, added.price]),
+        category=np.concatenate([catalog.category, added.category]),
+        color=np.concatenate([catalog.color, added.color]),
+        style_mask=style_mask,
+        categories=tables[0],
+        colors=tables[1],
+        tags=tables[2],
+        images=images,
+        # Appended items have no precomputed thumbnail and are rendered on demand
+        thumbnails=None if catalog.thumbnails is None else extend(catalog.thumbnails, [None] * len(appended)),
+        thumbnail_size=catalog.thumbnail_size,
+        removed=np.concatenate([removed, np.zeros(len(appended), dtype=bool)])
+    )
+
+    new_positions = np.arange(n, new_size)
+    index = index.updated(
+        new_size,
+        _index_keys(updated, new_positions),
+        _index_keys(catalog, tombstones)
+    )
+
+    if embeddings is not None:
+        if len(appended):
+            rows = build_item_embeddings(updated.take(new_positions), embeddings.shape[1])
+            embeddings = lineage.append_embeddings(embeddings, rows)
+    for pos in new_positions:
+        id_positions[updated.ids[pos]] = int(pos)
+    lineage.head = updated
+
+    compacted = False
+    if updated.removed.sum() > compact_fraction * new_size:
+        updated, index, embeddings, lineage = compact(updated, embeddings)
+        compacted = True
+
+    stats = {
+        'added': len(appended),
+        'removed': len(tombstones),
+        'repriced': repriced,
+        'missing': missing,
+        'size': len(updated),
+        'live': updated.num_live(),
+        'compacted': compacted,
+        'seconds': time.perf_counter() - start
+    }
+    return UpdateResult(updated, index, embeddings, lineage, changed_ids, stats)
+
+
+def compact(
+    catalog: Catalog,
+    embeddings: Optional[np.ndarray] = None
+) -> Tuple[Catalog, BitmapIndex, Optional[np.ndarray], CatalogLineage]:
+    """Drop tombstoned items and rebuild the index over the live ones"""
+    live = np.flatnonzero(~catalog.removed) if catalog.removed is not None else np.arange(len(catalog))
+    compacted = catalog.take(live)
+    compacted.removed = None
+    if embeddings is not None:
+        embeddings = np.ascontiguousarray(embeddings[live])
+    return compacted, BitmapIndex.from_catalog(compacted), embeddings, CatalogLineage(compacted, embeddings)
+
+
+def _same_except_price(catalog: Catalog, pos: int, row: Dict[str, Any]) -> bool:
+    """Whether row only differs from the item at pos in its price"""
+    current = catalog.row(pos)
+    if 'image' in row:
+        return False
+    for key, value in row.items():
+        if key == 'price':
+            continue
+        if key == 'category':
+            value = (value or '').lower()
+        if key == 'style_tags':
+            if sorted(value or []) != sorted(current['style_tags']):
+                return False
+        elif current.get(key) != value:
+            return False
+    return True
+
+
+def _concat_masks(mask: np.ndarray, extra: np.ndarray) -> np.ndarray:
+    """Stack two tag bitmasks, widening the narrower one if new tags added a word"""
+    words = max(mask.shape[1], extra.shape[1])
+    if mask.shape[1] < words:
+        mask = np.pad(mask, ((0, 0), (0, words - mask.shape[1])))
+    if extra.shape[1] < words:
+        extra = np.pad(extra, ((0, 0), (0, words - extra.shape[1])))
+    return np.concatenate([mask, extra])
+
+
+def _index_keys(catalog: Catalog, positions: np.ndarray) -> Dict[Tuple[str, str], np.ndarray]:
+    """Bitmap index keys of the items at positions, mapped to those positions"""
+    positions = np.asarray(positions, dtype=np.int64)
+    keys = {}
+    for kind, table, codes in (
+        ('category', catalog.categories, catalog.category[positions]),
+        ('color', catalog.colors, catalog.color[positions])
+    ):
+        for code in np.unique(codes[codes >= 0]):
+            keys[(kind, table[int(code)])] = positions[codes == code].astype(np.int32)
+
+    bits = np.unpackbits(
+        np.ascontiguousarray(catalog.style_mask[positions]).view(np.uint8), axis=1, bitorder='little'
+    )[:, :len(catalog.tags)].astype(bool)
+    for code in np.flatnonzero(bits.any(axis=0)):
+        keys[('tag', catalog.tags[int(code)])] = positions[bits[:, code]].astype(np.int32)
+    return keys
@@ -0,0 +1,84 @@
+"""Color-pair harmony table over an interned color vocabulary
+
+Every color name gets a hue on the color wheel or is treated as a neutral.
+Two colors harmonize when either is neutral, when they are analogous (close
+hues) or complementary (opposite hues); hues a third of the wheel apart make
+a bolder triad, and the hues in between clash. The pair scores are computed
+once per vocabulary into a table centered on zero, so scoring outfit colors
+is a gather: table[top, bottom] + table[top, shoe] + table[bottom, shoe].
+
+The table has one extra last row and column for unknown colors, so color
+code -1 (no color) indexes them directly and scores zero.
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+NEUTRALS = frozenset({
+    'Black', 'White', 'Gray', 'Grey', 'Beige', 'Cream', 'Ivory', 'Tan', 'Khaki', 'Navy', 'Denim', 'Silver'
+})
+# Hue in degrees of each chromatic color
+HUES: Dict[str, float] = {
+    'Red': 0, 'Burgundy': 345, 'Maroon': 350, 'Coral': 15, 'Orange': 30, 'Brown': 30, 'Camel': 35,
+    'Gold': 45, 'Mustard': 50, 'Yellow': 60, 'Olive': 75, 'Green': 120, 'Mint': 150, 'Teal': 180,
+    'Turquoise': 175, 'Blue': 220, 'Purple': 275, 'Lavender': 270, 'Magenta': 300, 'Pink': 330
+}
+# Harmony of a pair on a 0-1 scale; the table stores it minus NEUTRAL_SCORE
+NEUTRAL_SCORE = 0.5
+SAME_COLOR_SCORE = 0.7
+NEUTRAL_PAIR_SCORE = 0.75
+DEFAULT_WEIGHT = 0.3
+
+
+def pair_harmony(first: Optional[str], second: Optional[str]) -> float:
+    """How well two named colors go together, from 0 (clash) to 1"""
+    if not first or not second:
+        return NEUTRAL_SCORE
+    first, second = first.title(), second.title()
+    if first == second:
+        return SAME_COLOR_SCORE
+    if first in NEUTRALS or second in NEUTRALS:
+        return NEUTRAL_PAIR_SCORE
+    if first not in HUES or second not in HUES:
+        return NEUTRAL_SCORE
+    distance = abs(HUES[first] - HUES[second]) % 360
+    distance = min(distance, 360 - distance)
+    if distance <= 40:
+        return 0.9   # analogous
+    if distance >= 150:
+        return 0.8   # complementary
+    if 105 <= distance <= 135:
+        return 0.6   # triadic
+    return 0.25
+
+
+class ColorHarmony:
+    """Precomputed pair harmony for a color vocabulary, indexed by color code"""
+
+    def __init__(self, colors: Iterable[str], weight: float = DEFAULT_WEIGHT):
+        self.colors: List[str] = list(colors)
+        self.weight = weight
+        self._codes = {color: code for code, color in enumerate(self.colors)}
+        size = len(self.colors) + 1
+        table = np.zeros((size, size), dtype=np.float32)
+        for i, first in enumerate(self.colors):
+            for j, second in enumerate(self.colors):
+                table[i, j] = pair_harmony(first, second) - NEUTRAL_SCORE
+        self.table = table
+
+    @classmethod
+    def default(cls, weight: float = DEFAULT_WEIGHT) -> 'ColorHarmony':
+        """Table over every color this module knows, for items without a catalog vocabulary"""
+        return cls(sorted(NEUTRALS | set(HUES)), weight)
+
+    def codes(self, colors: Iterable[Optional[str]]) -> np.ndarray:
+        """Codes of named colors in this vocabulary, -1 for unknown ones"""
+        codes = self._codes
+        return np.fromiter(
+            (codes.get(color.title() if color else color, -1) for color in colors), dtype=np.int64
+        )
+
+    def outfit_scores(self, tops: np.ndarray, bottoms: np.ndarray, shoes: np.ndarray) -> np.ndarray:
+        """Weighted harmony of color-code arrays, broadcast against each other"""
+        table = self.table
+        return self.weight * (table[tops, bottoms] + table[tops, shoes] + table[bottoms, shoes])
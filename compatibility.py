@@ -0,0 +1,203 @@
+"""Outfit compatibility learned from Polyvore outfit co-occurrence
+
+Polyvore items belong to user-made outfits (sets). Every top and bottom
+that appear in the same set, and every bottom and shoe, count as one
+co-occurrence; the counts become two sparse matrices in CSR form over the
+item ids, with values log-scaled into (0, 1]. They are keyed by item id
+rather than catalog position, so they stay valid across catalog updates, and
+are stored next to the catalog snapshot:
+
+    python compatibility.py catalog.snap
+    python compatibility.py catalog.snap --jsonl items.jsonl
+
+which writes catalog.snap.compat.npz. An item's set comes from a set_id or
+outfit_id field, or from Polyvore-style "<set>_<index>" item ids.
+"""
+import argparse
+import re
+from itertools import product
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+SET_ALIASES = ('set_id', 'outfit_id')
+SET_ITEM_ID = re.compile(r'^(.+)_(\d+)$')
+# Score added to an outfit per unit of compatibility
+DEFAULT_WEIGHT = 0.5
+
+
+class CompatibilityMatrix:
+    """Sparse (rows x cols) float32 matrix in CSR form with vectorized lookups"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, shape: Tuple[int, int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = shape
+        # Flattened row * cols + col of every stored entry; sorted because the
+        # CSR rows are in order and the columns are sorted within each row
+        rows = np.repeat(np.arange(shape[0], dtype=np.int64), np.diff(indptr))
+        self._flat = rows * shape[1] + indices
+
+    @classmethod
+    def from_pairs(cls, rows: np.ndarray, cols: np.ndarray, shape: Tuple[int, int]) -> 'CompatibilityMatrix':
+        """Count repeated (row, col) pairs and scale the counts into (0, 1]"""
+        flat, counts = np.unique(
+            np.asarray(rows, dtype=np.int64) * shape[1] + np.asarray(cols, dtype=np.int64), return_counts=True
+        )
+        data = (np.log1p(counts) / np.log1p(counts.max())).astype(np.float32) if len(counts) else np.empty(0, np.float32)
+        indptr = np.searchsorted(flat // shape[1], np.arange(shape[0] + 1)).astype(np.int64)
+        return cls(indptr, (flat % shape[1]).astype(np.int32), data, shape)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    def lookup(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """Values at (rows[i], cols[i]), 0 where nothing is stored or a key is -1"""
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        values = np.zeros(len(rows), dtype=np.float32)
+        valid = np.flatnonzero((rows >= 0) & (cols >= 0))
+        if not len(valid) or not self.nnz:
+            return values
+        flat = rows[valid] * self.shape[1] + cols[valid]
+        found = np.minimum(np.searchsorted(self._flat, flat), self.nnz - 1)
+        hit = self._flat[found] == flat
+        values[valid[hit]] = self.data[found[hit]]
+        return values
+
+    def entries(self, row_keys: np.ndarray, col_keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Stored entries between two key lists as (row index, col index, value) into those lists"""
+        row_keys, col_keys = np.asarray(row_keys, dtype=np.int64), np.asarray(col_keys, dtype=np.int64)
+        local_rows = np.flatnonzero(row_keys >= 0)
+        starts = self.indptr[row_keys[local_rows]]
+        lengths = self.indptr[row_keys[local_rows] + 1] - starts
+        total = int(lengths.sum())
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        if not total:
+            return empty
+        row_index = np.repeat(local_rows, lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        stored = np.repeat(starts, lengths) + offsets
+        cols = self.indices[stored]
+
+        order = np.argsort(col_keys, kind='stable')
+        sorted_keys = col_keys[order]
+        found = np.minimum(np.searchsorted(sorted_keys, cols), len(sorted_keys) - 1)
+        hit = sorted_keys[found] == cols
+        return row_index[hit], order[found[hit]], self.data[stored[hit]]
+
+
+class OutfitCompatibility:
+    """Top-bottom and bottom-shoe compatibility over a shared item id vocabulary"""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        top_bottom: CompatibilityMatrix,
+        bottom_shoe: CompatibilityMatrix,
+        weight: float = DEFAULT_WEIGHT
+    ):
+        self.ids = list(ids)
+        self.top_bottom = top_bottom
+        self.bottom_shoe = bottom_shoe
+        self.weight = weight
+        self._keys: Dict[str, int] = {item_id: key for key, item_id in enumerate(self.ids)}
+
+    def keys(self, item_ids: Iterable[Optional[str]]) -> np.ndarray:
+        """Matrix keys of the given item ids, -1 for items never seen in an outfit"""
+        keys = self._keys
+        return np.fromiter((keys.get(item_id, -1) for item_id in item_ids), dtype=np.int64)
+
+    def save(self, path: str):
+        arrays = {'ids': np.array(self.ids, dtype=str)}
+        for name in ('top_bottom', 'bottom_shoe'):
+            matrix = getattr(self, name)
+            arrays[f'{name}.indptr'] = matrix.indptr
+            arrays[f'{name}.indices'] = matrix.indices
+            arrays[f'{name}.data'] = matrix.data
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str, weight: float = DEFAULT_WEIGHT) -> 'OutfitCompatibility':
+        with np.load(path) as data:
+            ids = data['ids'].tolist()
+            size = len(ids)
+            matrices = [
+                CompatibilityMatrix(
+                    data[f'{name}.indptr'], data[f'{name}.indices'], data[f'{name}.data'], (size, size)
+                )
+                for name in ('top_bottom', 'bottom_shoe')
+            ]
+        return cls(ids, *matrices, weight=weight)
+
+
+def compatibility_path(snapshot_path: str) -> str:
+    """Where the compatibility matrices of a catalog snapshot are stored"""
+    return f'{snapshot_path}.compat.npz'
+
+
+def set_of(row: Dict, item_id: str) -> Optional[str]:
+    """Outfit set an item belongs to, if the row tells"""
+    for alias in SET_ALIASES:
+        value = row.get(alias)
+        if value not in (None, ''):
+            return str(value)
+    match = SET_ITEM_ID.match(item_id)
+    return match.group(1) if match else None
+
+
+def build_compatibility(rows: Iterable[Dict]) -> OutfitCompatibility:
+    """Count top-bottom and bottom-shoe co-occurrences in the outfit sets of raw dataset rows"""
+    from ingest import normalize_row
+
+    sets: Dict[str, Dict[str, list]] = {}
+    keys: Dict[str, int] = {}
+    for position, row in enumerate(rows):
+        item = normalize_row(row, position)
+        if item['category'] not in ('tops', 'bottoms', 'shoes'):
+            continue
+        set_id = set_of(row, item['id'])
+        if set_id is None:
+            continue
+        key = keys.setdefault(item['id'], len(keys))
+        sets.setdefault(set_id, {}).setdefault(item['category'], []).append(key)
+
+    pairs = {'top_bottom': ([], []), 'bottom_shoe': ([], [])}
+    for members in sets.values():
+        for name, (left, right) in (('top_bottom', ('tops', 'bottoms')), ('bottom_shoe', ('bottoms', 'shoes'))):
+            for a, b in product(members.get(left, ()), members.get(right, ())):
+                pairs[name][0].append(a)
+                pairs[name][1].append(b)
+
+    size = max(1, len(keys))
+    return OutfitCompatibility(
+        list(keys),
+        *(CompatibilityMatrix.from_pairs(*pairs[name], (size, size)) for name in ('top_bottom', 'bottom_shoe'))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build outfit compatibility matrices next to a catalog snapshot")
+    parser.add_argument('snapshot', help="Catalog snapshot the matrices accompany")
+    parser.add_argument('--dataset', default='Marqo/polyvore')
+    parser.add_argument('--split', default='data')
+    parser.add_argument('--jsonl', help="Read rows from a JSON-lines file instead of the dataset")
+    args = parser.parse_args()
+
+    from ingest import load_source
+    source = load_source(args)
+    if not isinstance(source, list) and 'image' in source.column_names:
+        source = source.remove_columns('image')
+    compatibility = build_compatibility(source)
+    path = compatibility_path(args.snapshot)
+    compatibility.save(path)
+    print(
+        f"Wrote compatibility of {len(compatibility.ids)} items to {path}: "
+        f"{compatibility.top_bottom.nnz} top-bottom and {compatibility.bottom_shoe.nnz} bottom-shoe pairs"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+OUTFIT_CATEGORIES = ('tops', 'bottoms', 'shoes')
+
+
+@dataclass
+class CategoryCandidates:
+    """Candidate items of one category: caller-defined ids with their prices and scores
+
+    keys optionally hold each item's key into the outfit compatibility
+    matrices and colors its code in the color-harmony vocabulary (-1 for
+    items without one).
+    """
+    ids: np.ndarray
+    prices: np.ndarray
+    scores: np.ndarray
+    keys: Optional[np.ndarray] = None
+    colors: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_lists(
+        cls,
+        ids: Sequence,
+        prices: Sequence[float],
+        scores: Sequence[float],
+        keys: Optional[Sequence[int]] = None,
+        colors: Optional[Sequence[int]] = None
+    ) -> 'CategoryCandidates':
+        """Build candidates from plain lists; ids may be arbitrary objects such as item rows"""
+        id_array = np.empty(len(ids), dtype=object)
+        id_array[:] = ids
+        return cls(
+            id_array,
+            np.asarray(prices, dtype=np.float64),
+            np.asarray(scores, dtype=np.float64),
+            None if keys is None else np.asarray(keys, dtype=np.int64),
+            None if colors is None else np.asarray(colors, dtype=np.int64)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def prune(self, beam: int) -> 'CategoryCandidates':
+        """Keep the beam best-scoring and beam cheapest items, sorted by price
+
+        The cheapest items guarantee that a feasible outfit is still found
+        whenever one exists; the best-scoring ones carry the quality.
+        """
+        if len(self) > 2 * beam:
+            keep = np.union1d(
+                np.argpartition(-self.scores, beam)[:beam],
+                np.argpartition(self.prices, beam)[:beam]
+            )
+        else:
+            keep = np.arange(len(self))
+        keep = keep[np.argsort(self.prices[keep], kind='stable')]
+        return CategoryCandidates(
+            self.ids[keep], self.prices[keep], self.scores[keep],
+            None if self.keys is None else self.keys[keep],
+            None if self.colors is None else self.colors[keep]
+        )
+
+
+def random_scores(count: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Uniform tie-breaking scores for requests without a style profile"""
+    rng = rng or np.random.default_rng()
+    return rng.random(count)
+
+
+def compose_outfits(
+    tops: CategoryCandidates,
+    bottoms: CategoryCandidates,
+    shoes: CategoryCandidates,
+    budget: float,
+    num_outfits: int,
+    beam: int = 64,
+    compatibility=None,
+    harmony=None
+) -> List[Tuple[Tuple, float, float]]:
+    """Find the highest-scoring (top, bottom, shoe) outfits whose total price fits the budget
+
+    Every (top, bottom) pair among the pruned candidates is evaluated at once;
+    the best affordable shoe for each pair is found by bisecting the remaining
+    budget into the price-sorted shoes and reading a prefix arg-max of their
+    scores. Pairs are then ranked by total score, so each result uses a
+    different (top, bottom) pair. When there are fewer affordable pairs than
+    num_outfits, the rest are filled with the pairs' next-best affordable
+    shoes. Returns [((top_id, bottom_id, shoe_id), total_price, total_score)]
+    sorted by score, best first.
+
+    With an OutfitCompatibility and candidate keys, top-bottom compatibility
+    is added to each pair's score with one gather, and shoes compatible with
+    the pair's bottom compete with the best plain shoe including their bonus.
+
+    With a ColorHarmony and candidate colors, the harmony of the outfit's
+    three colors is added to its score. The best affordable shoe of every
+    shoe color is found per pair as above, and the harmony of every pair
+    with every shoe color is scored in one broadcast to pick among them.
+    """
+    if num_outfits <= 0 or not len(tops) or not len(bottoms) or not len(shoes):
+        return []
+    tops, bottoms, shoes = tops.prune(beam), bottoms.prune(beam), shoes.prune(beam)
+
+    # Cheapest possible outfit already too expensive: nothing to compose
+    if tops.prices[0] + bottoms.prices[0] + shoes.prices[0] > budget:
+        return []
+
+    top_index, bottom_index = np.meshgrid(np.arange(len(tops)), np.arange(len(bottoms)), indexing='ij')
+    top_index, bottom_index = top_index.ravel(), bottom_index.ravel()
+    remaining = budget - tops.prices[top_index] - bottoms.prices[bottom_index]
+    feasible = remaining >= shoes.prices[0]
+    top_index, bottom_index, remaining = top_index[feasible], bottom_index[feasible], remaining[feasible]
+
+    shoe_bonus = None
+    if harmony is not None and tops.colors is not None and bottoms.colors is not None and shoes.colors is not None:
+        pair_top, pair_bottom = tops.colors[top_index], bottoms.colors[bottom_index]
+        shoe_index, shoe_values = _harmonious_shoes(shoes, pair_top, pair_bottom, remaining, harmony)
+
+        def shoe_bonus(pairs, shoe):
+            return harmony.outfit_scores(pair_top[pairs], pair_bottom[pairs], shoes.colors[shoe])
+    else:
+        shoe_index = _best_shoes(shoes, remaining)
+        shoe_values = shoes.scores[shoe_index]
+
+    totals = tops.scores[top_index] + bottoms.scores[bottom_index] + shoe_values
+    if compatibility is not None and tops.keys is not None and bottoms.keys is not None:
+        totals = totals + compatibility.weight * compatibility.top_bottom.lookup(
+            tops.keys[top_index], bottoms.keys[bottom_index]
+        )
+    if compatibility is not None and bottoms.keys is not None and shoes.keys is not None:
+        shoe_index, totals = _compatible_shoes(
+            shoes, bottom_index, remaining, shoe_index, totals,
+            compatibility.bottom_shoe.entries(bottoms.keys, shoes.keys), compatibility.weight, shoe_bonus
+        )
+    count = min(num_outfits, len(totals))
+    if count < len(totals):
+        chosen = np.argpartition(-totals, count - 1)[:count]
+    else:
+        chosen = np.arange(len(totals))
+    pairs, chosen_shoes, chosen_totals = chosen, shoe_index[chosen], totals[chosen]
+
+    if count < num_outfits:
+        # Too few pairs: every other affordable shoe of every pair competes for
+        # the remaining results. There are fewer pairs than num_outfits here,
+        # so scoring all of them at once stays small.
+        extra_pairs, extra_shoes = np.nonzero(shoes.prices[None, :] <= remaining[:, None])
+        other = extra_shoes != shoe_index[extra_pairs]
+        extra_pairs, extra_shoes = extra_pairs[other], extra_shoes[other]
+        extra_totals = _outfit_totals(
+            tops, bottoms, shoes, top_index[extra_pairs], bottom_index[extra_pairs], extra_shoes,
+            compatibility, harmony
+        )
+        best = np.argsort(-extra_totals, kind='stable')[:num_outfits - count]
+        pairs = np.concatenate([pairs, extra_pairs[best]])
+        chosen_shoes = np.concatenate([chosen_shoes, extra_shoes[best]])
+        chosen_totals = np.concatenate([chosen_totals, extra_totals[best]])
+
+    order = np.argsort(-chosen_totals, kind='stable')
+    return [
+        (
+            (tops.ids[t], bottoms.ids[b], shoes.ids[s]),
+            float(tops.prices[t] + bottoms.prices[b] + shoes.prices[s]),
+            float(total)
+        )
+        for t, b, s, total in zip(
+            top_index[pairs][order], bottom_index[pairs][order], chosen_shoes[order], chosen_totals[order]
+        )
+    ]
+
+
+def _outfit_totals(
+    tops: CategoryCandidates,
+    bottoms: CategoryCandidates,
+    shoes: CategoryCandidates,
+    top: np.ndarray,
+    bottom: np.ndarray,
+    shoe: np.ndarray,
+    compatibility=None,
+    harmony=None
+) -> np.ndarray:
+    """Total score of explicit (top, bottom, shoe) index triples, as compose_outfits scores them"""
+    totals = tops.scores[top] + bottoms.scores[bottom] + shoes.scores[shoe]
+    if compatibility is not None and tops.keys is not None and bottoms.keys is not None:
+        totals = totals + compatibility.weight * compatibility.top_bottom.lookup(tops.keys[top], bottoms.keys[bottom])
+    if compatibility is not None and bottoms.keys is not None and shoes.keys is not None:
+        totals = totals + compatibility.weight * compatibility.bottom_shoe.lookup(bottoms.keys[bottom], shoes.keys[shoe])
+    if harmony is not None and tops.colors is not None and bottoms.colors is not None and shoes.colors is not None:
+        totals = totals + harmony.outfit_scores(tops.colors[top], bottoms.colors[bottom], shoes.colors[shoe])
+    return totals
+
+
+def _best_shoes(shoes: CategoryCandidates, remaining: np.ndarray) -> np.ndarray:
+    """Highest-scoring shoe within each remaining budget, -1 where none is affordable"""
+    # best[j] is the highest-scoring shoe among the j + 1 cheapest
+    is_running_best = shoes.scores >= np.maximum.accumulate(shoes.scores)
+    best = np.maximum.accumulate(np.where(is_running_best, np.arange(len(shoes)), 0))
+    affordable = np.searchsorted(shoes.prices, remaining, side='right') - 1
+    return np.where(affordable >= 0, best[np.maximum(affordable, 0)], -1)
+
+
+def _harmonious_shoes(
+    shoes: CategoryCandidates,
+    pair_top: np.ndarray,
+    pair_bottom: np.ndarray,
+    remaining: np.ndarray,
+    harmony
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best shoe per pair counting outfit color harmony, with its score plus the harmony"""
+    shoe_colors, color_index = np.unique(shoes.colors, return_inverse=True)
+    # best[j, c] is the highest-scoring shoe of color c among the j cheapest, -1 if none
+    best = np.full((len(shoes) + 1, len(shoe_colors)), -1, dtype=np.int64)
+    for c in range(len(shoe_colors)):
+        members = color_index == c
+        masked = np.where(members, shoes.scores, -np.inf)
+        is_running_best = members & (masked >= np.maximum.accumulate(masked))
+        best[1:, c] = np.maximum.accumulate(np.where(is_running_best, np.arange(len(shoes)), -1))
+    choice = best[np.searchsorted(shoes.prices, remaining, side='right')]
+
+    # Harmony of every pair's top and bottom with each shoe color, gathered as whole rows
+    columns = harmony.weight * harmony.table[:, shoe_colors]
+    values = shoes.scores[choice] + columns[pair_top] + columns[pair_bottom]
+    values[choice < 0] = -np.inf
+    picked = np.argmax(values, axis=1)
+    rows = np.arange(len(remaining))
+    pair_values = harmony.weight * harmony.table[pair_top, pair_bottom]
+    return choice[rows, picked], values[rows, picked] + pair_values
+
+
+def _compatible_shoes(
+    shoes: CategoryCandidates,
+    bottom_index: np.ndarray,
+    remaining: np.ndarray,
+    shoe_index: np.ndarray,
+    totals: np.ndarray,
+    entries: Tuple[np.ndarray, np.ndarray, np.ndarray],
+    weight: float,
+    shoe_bonus: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Swap in a compatible shoe wherever its bonus beats the pair's current shoe
+
+    shoe_bonus(pairs, shoes) gives any other pair-dependent score of a shoe,
+    such as color harmony, already included in totals for the current shoe.
+    """
+    entry_bottom, entry_shoe, entry_value = entries
+    if not len(entry_bottom):
+        return shoe_index, totals
+    order = np.argsort(entry_bottom, kind='stable')
+    entry_bottom, entry_shoe, entry_value = entry_bottom[order], entry_shoe[order], entry_value[order]
+
+    # Expand every pair into the compatible shoes of its bottom
+    starts = np.searchsorted(entry_bottom, bottom_index)
+    counts = np.searchsorted(entry_bottom, bottom_index, side='right') - starts
+    pair = np.repeat(np.arange(len(bottom_index)), counts)
+    entry = np.repeat(starts, counts) + np.arange(len(pair)) - np.repeat(np.cumsum(counts) - counts, counts)
+    shoe = entry_shoe[entry]
+    affordable = shoes.prices[shoe] <= remaining[pair]
+    pair, shoe = pair[affordable], shoe[affordable]
+    gain = shoes.scores[shoe] + weight * entry_value[entry[affordable]] - shoes.scores[shoe_index[pair]]
+    if shoe_bonus is not None:
+        gain += shoe_bonus(pair, shoe) - shoe_bonus(pair, shoe_index[pair])
+
+    # Keep the largest positive gain per pair
+    better = gain > 0
+    pair, shoe, gain = pair[better], shoe[better], gain[better]
+    if not len(pair):
+        return shoe_index, totals
+    order = np.lexsort((gain, pair))
+    last = np.r_[pair[order][1:] != pair[order][:-1], True]
+    pair, shoe, gain = pair[order][last], shoe[order][last], gain[order][last]
+
+    shoe_index = shoe_index.copy()
+    shoe_index[pair] = shoe
+    totals = totals.copy()
+    totals[pair] += gain
+    return shoe_index, totals
@@ -0,0 +1,179 @@
+import functools
+import re
+import zlib
+import numpy as np
+from typing import Iterable, List, Optional
+
+from catalog import Catalog
+
+EMBEDDING_DIM = 256
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Relative weight of each field in an item embedding
+TEXT_WEIGHT = 1.0
+TAG_WEIGHT = 2.0
+COLOR_WEIGHT = 2.0
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _feature(token: str, dim: int):
+    """Stable signed feature-hash bucket for a token"""
+    h = zlib.crc32(token.encode('utf-8'))
+    return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+
+
+def tag_token(tag: str) -> str:
+    return f'tag:{tag.lower()}'
+
+
+def color_token(color: str) -> str:
+    return f'color:{color.lower()}'
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def embed_tokens(weighted_tokens: Iterable, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Hash (token, weight) pairs into an L2-normalized float32 vector"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token, weight in weighted_tokens:
+        bucket, sign = _feature(token, dim)
+        vector[bucket] += sign * weight
+    return normalize(vector)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or the rows of a matrix, leaving zero rows at zero"""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def build_item_embeddings(catalog: Catalog, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Embed every catalog item from its name, description, style tags and color
+
+    Returns one C-contiguous (n, dim) float32 matrix with unit-length rows, so a
+    dot product with a normalized profile is the cosine similarity.
+    """
+    n = len(catalog)
+    matrix = np.zeros((n, dim), dtype=np.float32)
+
+    # Name and description tokens are per item; hash them in one pass
+    rows, buckets, values = [], [], []
+    for pos in range(n):
+        for field in (catalog.names[pos], catalog.descriptions[pos]):
+            for token in tokenize(field):
+                bucket, sign = _feature(token, dim)
+                rows.append(pos)
+                buckets.append(bucket)
+                values.append(sign * TEXT_WEIGHT)
+    if rows:
+        np.add.at(matrix, (np.asarray(rows), np.asarray(buckets)), np.asarray(values, dtype=np.float32))
+
+    # Tags and colors come from small vocabularies; add them as matrix products
+    if len(catalog.tags):
+        tag_vectors = np.zeros((len(catalog.tags), dim), dtype=np.float32)
+        for code, tag in enumerate(catalog.tags):
+            bucket, sign = _feature(tag_token(tag), dim)
+            tag_vectors[code, bucket] = sign * TAG_WEIGHT
+        tag_bits = np.unpackbits(
+            np.ascontiguousarray(catalog.style_mask).view(np.uint8), axis=1, bitorder='little'
+        )[:, :len(catalog.tags)]
+        matrix += tag_bits.astype(np.float32) @ tag_vectors
+
+    if len(catalog.colors):
+        color_vectors = np.zeros((len(catalog.colors) + 1, dim), dtype=np.float32)
+        for code, color in enumerate(catalog.colors):
+            bucket, sign = _feature(color_token(color), dim)
+            color_vectors[code, bucket] = sign * COLOR_WEIGHT
+        # Missing colors (code -1) index the trailing all-zero row
+        matrix += color_vectors[catalog.color]
+
+    return np.ascontiguousarray(normalize(matrix), dtype=np.float32)
+
+
+def profile_vector(style_profile, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Convert a style profile (torch tensor or array-like) into a normalized float32 vector"""
+    if hasattr(style_profile, 'detach'):
+        style_profile = style_profile.detach().cpu().numpy()
+    vector = np.asarray(style_profile, dtype=np.float32).reshape(-1)
+    if vector.shape[0] != dim:
+        raise ValueError(f"style_profile has {vector.shape[0]} dimensions, expected {dim}")
+    return normalize(vector)
+
+
+def top_k(
+    matrix: np.ndarray,
+    query: np.ndarray,
+    k: int,
+    candidates: Optional[np.ndarray] = None,
+    block_size: int = 65536
+):
+    """Highest-scoring rows of matrix for query, as (positions, scores) sorted by score
+
+    Scores are computed block by block with a matrix-vector product and only the
+    running top k are kept, so memory stays bounded by block_size + k.
+    """
+    total = len(matrix) if candidates is None else len(candidates)
+    k = min(k, total)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    best_positions = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, total, block_size):
+        if candidates is None:
+            positions = np.arange(start, min(start + block_size, total))
+            scores = matrix[start:start + block_size] @ query
+        else:
+            positions = np.asarray(candidates[start:start + block_size], dtype=np.int64)
+            scores = matrix[positions] @ query
+        if len(scores) > k:
+            keep = np.argpartition(scores, -k)[-k:]
+            positions, scores = positions[keep], scores[keep]
+        best_positions = np.concatenate([best_positions, positions])
+        best_scores = np.concatenate([best_scores, scores])
+        if len(best_scores) > k:
+            keep = np.argpartition(best_scores, -k)[-k:]
+            best_positions, best_scores = best_positions[keep], best_scores[keep]
+
+    order = np.argsort(-best_scores, kind='stable')
+    return best_positions[order], best_scores[order]
+
+
+def top_k_batch(
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    candidates: np.ndarray,
+    values: Optional[np.ndarray] = None,
+    limits: Optional[np.ndarray] = None,
+    block_size: int = 16384
+) -> List[np.ndarray]:
+    """Top k candidate rows for each of several queries, scored as one matrix product per block
+
+    When values and limits are given, a candidate is only eligible for query j
+    if values[candidate] <= limits[j] (e.g. an item's price under that
+    request's cap). Returns one position array per query, best first.
+    """
+    num_queries = len(queries)
+    best_positions = np.empty((num_queries, 0), dtype=np.int64)
+    best_scores = np.empty((num_queries, 0), dtype=np.float32)
+    for start in range(0, len(candidates), block_size):
+        positions = np.asarray(candidates[start:start + block_size], dtype=np.int64)
+        scores = (matrix[positions] @ queries.T).T
+        if limits is not None:
+            scores = np.where(values[positions][None, :] <= limits[:, None], scores, -np.inf)
+        best_positions = np.concatenate(
+            [best_positions, np.broadcast_to(positions, (num_queries, len(positions)))], axis=1
+        )
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        if best_scores.shape[1] > k:
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_positions = np.take_along_axis(best_positions, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    best_positions = np.take_along_axis(best_positions, order, axis=1)
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    return [row[np.isfinite(scores)] for row, scores in zip(best_positions, best_scores)]
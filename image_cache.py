@@ -0,0 +1,98 @@
+import base64
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class ThumbnailCache:
+    """Thread-safe LRU cache of encoded thumbnails bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._entries[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Optional[str]]) -> Optional[str]:
+        """Return the cached value for key, creating it with factory on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def make_thumbnail(image: Any, size: Tuple[int, int], quality: int = 85) -> Optional[str]:
+    """Resize an item image to fit size and return it as a base64-encoded JPEG
+
+    Accepts a PIL image, raw image bytes, a file path, a base64 string or
+    data URI, or a Hugging Face image dict with 'bytes' or 'path'.
+    """
+    if image is None:
+        return None
+    # Pillow is only needed once a thumbnail is actually rendered
+    from PIL import Image
+
+    if isinstance(image, dict):
+        image = image.get('bytes') or image.get('path')
+        if image is None:
+            return None
+    if isinstance(image, str):
+        # A data URI or an existing file path; anything else must be plain base64
+        if image.startswith('data:'):
+            image = base64.b64decode(image.partition(',')[2])
+        elif not os.path.exists(image):
+            image = base64.b64decode(image)
+    if isinstance(image, (bytes, bytearray)):
+        image = io.BytesIO(image)
+    if not isinstance(image, Image.Image):
+        image = Image.open(image)
+
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail(size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format='JPEG', quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
@@ -0,0 +1,357 @@
+"""Offline ingestion of the Polyvore dataset into a ready-to-serve catalog snapshot
+
+Run once per catalog release:
+
+    python ingest.py catalog.snap
+    python ingest.py catalog.snap --jsonl items.jsonl --workers 8
+
+Rows are normalized (ids, names, prices, lowercase categories mapped onto the
+recommender's categories, colors and style tags derived from the text when
+missing) and thumbnails are rendered in a process pool, one chunk of rows per
+task. Each finished chunk is written to the work directory and recorded in
+its manifest with a fingerprint of its input, so an interrupted or repeated
+run only redoes chunks that are missing or whose rows changed. The chunks are
+then assembled into a snapshot that WardrobeRecommender.from_snapshot and
+service.py --snapshot serve directly.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from catalog import Catalog, StringColumn
+from image_cache import make_thumbnail
+from snapshot import write_snapshot
+from WardrobeRecommender import CATEGORIES, OCCASION_STYLES
+
+# Bump when normalization changes so existing chunks are rebuilt
+INGEST_VERSION = 1
+
+# Source column names tried in order for each catalog field
+FIELD_ALIASES = {
+    'id': ('id', 'item_ID', 'item_id'),
+    'name': ('name', 'title', 'text'),
+    'description': ('description', 'text'),
+    'category': ('category', 'semantic_category'),
+    'price': ('price',),
+    'color': ('color', 'colour'),
+    'style_tags': ('style_tags', 'tags'),
+    'image_url': ('image_url', 'url'),
+    'purchase_link': ('purchase_link', 'link', 'url')
+}
+
+# Extra words that identify each recommender category beyond its subcategory names
+CATEGORY_KEYWORDS = {
+    'tops': ['top', 'tee', 'tank', 'cami', 'blazer', 'cardigan', 'hoodie', 'sweatshirt', 'coat', 'tunic'],
+    'bottoms': ['bottom', 'trousers', 'leggings', 'joggers', 'culottes'],
+    'dresses': ['romper', 'playsuit'],
+    'shoes': ['shoe', 'sandals', 'pumps', 'loafers', 'oxfords', 'mules', 'slippers', 'trainers'],
+    'accessories': [
+        'accessory', 'handbag', 'clutch', 'tote', 'backpack', 'wallet', 'hat', 'cap', 'sunglasses',
+        'watch', 'necklace', 'earrings', 'bracelet', 'ring', 'gloves'
+    ]
+}
+
+# Words in an item's name, description or category that imply each style tag
+STYLE_KEYWORDS = {
+    'Formal': ['gown', 'tuxedo', 'suit', 'satin', 'evening', 'pumps'],
+    'Elegant': ['silk', 'lace', 'chiffon', 'pearl', 'velvet', 'heels'],
+    'Classic': ['classic', 'trench', 'oxford', 'loafers', 'cashmere', 'tailored'],
+    'Professional': ['blazer', 'trousers', 'pencil', 'button-down', 'shirt', 'office'],
+    'Conservative': ['midi', 'cardigan', 'turtleneck', 'modest'],
+    'Casual': ['tee', 't-shirt', 'jeans', 'denim', 'shorts', 'hoodie', 'sneakers', 'flats'],
+    'Comfortable': ['knit', 'jersey', 'cotton', 'joggers', 'leggings', 'slippers', 'sweater'],
+    'Streetwear': ['graphic', 'oversized', 'cargo', 'bomber', 'cap', 'trainers'],
+    'Trendy': ['crop', 'cropped', 'platform', 'neon', 'metallic'],
+    'Stylish': ['leather', 'boots', 'statement', 'chic'],
+    'Bold': ['sequin', 'sequined', 'animal', 'leopard', 'glitter', 'fringe'],
+    'Romantic': ['floral', 'ruffle', 'ruffled', 'bow', 'pink', 'blush']
+}
+# Tags given to items whose text matches no keyword
+DEFAULT_STYLE_TAGS = ['Casual']
+
+COLOR_WORDS = [
+    'black', 'white', 'blue', 'navy', 'red', 'green', 'pink', 'purple', 'yellow', 'orange',
+    'brown', 'beige', 'gray', 'grey', 'cream', 'ivory', 'gold', 'silver', 'burgundy', 'khaki'
+]
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+PRICE_PATTERN = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _build_category_lookup() -> Dict[str, str]:
+    lookup = {}
+    for category, kinds in CATEGORIES.items():
+        words = [category, category.rstrip('s')] + kinds + CATEGORY_KEYWORDS.get(category, [])
+        for word in words:
+            lookup.setdefault(word, category)
+            lookup.setdefault(word + 's', category)
+    return lookup
+
+
+CATEGORY_LOOKUP = _build_category_lookup()
+KNOWN_STYLES = {style for styles in OCCASION_STYLES.values() for style in styles}
+
+
+def words(text: Optional[str]) -> List[str]:
+    return WORD_PATTERN.findall(text.lower()) if text else []
+
+
+def map_category(raw: Optional[str], name: Optional[str] = None) -> str:
+    """Map a raw category (falling back to the item name) onto a recommender category"""
+    for text in (raw, name):
+        tokens = words(text)
+        # Prefer the last word ("Day Dresses", "Ankle Boots") before any other
+        for token in reversed(tokens):
+            if token in CATEGORY_LOOKUP:
+                return CATEGORY_LOOKUP[token]
+    return (raw or 'other').strip().lower() or 'other'
+
+
+def parse_price(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        match = PRICE_PATTERN.search(value.replace(',', ''))
+        if not match:
+            return None
+        value = match.group()
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) and price >= 0 else None
+
+
+def derive_color(text_words: List[str]) -> Optional[str]:
+    for word in text_words:
+        if word in COLOR_WORDS:
+            return 'Gray' if word == 'grey' else word.title()
+    return None
+
+
+def derive_style_tags(text_words: List[str]) -> List[str]:
+    present = set(text_words)
+    tags = [tag for tag, keywords in STYLE_KEYWORDS.items() if present.intersection(keywords)]
+    return tags or list(DEFAULT_STYLE_TAGS)
+
+
+def _first(row: Dict[str, Any], field: str) -> Any:
+    for alias in FIELD_ALIASES[field]:
+        value = row.get(alias)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def normalize_row(row: Dict[str, Any], position: int) -> Dict[str, Any]:
+    """Normalize one raw dataset row into the catalog's row shape"""
+    name = _first(row, 'name')
+    name = str(name).strip() if name is not None else None
+    description = _first(row, 'description')
+    raw_category = _first(row, 'category')
+    text_words = words(' '.join(str(part) for part in (name, description, raw_category) if part))
+
+    color = _first(row, 'color')
+    style_tags = _first(row, 'style_tags')
+    if isinstance(style_tags, str):
+        style_tags = [tag.strip() for tag in style_tags.split(',')]
+    style_tags = [tag.strip().title() for tag in style_tags or [] if tag and tag.strip()]
+    item_id = _first(row, 'id')
+
+    return {
+        'id': str(item_id) if item_id is not None else f'item{position}',
+        'name': name,
+        'category': map_category(raw_category, name),
+        'price': parse_price(_first(row, 'price')),
+        'color': str(color).strip().title() if color else derive_color(text_words),
+        'style_tags': [tag for tag in style_tags if tag in KNOWN_STYLES] or derive_style_tags(text_words),
+        'image_url': _first(row, 'image_url'),
+        'purchase_link': _first(row, 'purchase_link'),
+        'description': str(description) if description is not None else ''
+    }
+
+
+def fingerprint(rows: List[Dict[str, Any]], thumbnail_size: Tuple[int, int]) -> str:
+    """Digest of a chunk's input rows and settings, used to detect changed chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([INGEST_VERSION, list(thumbnail_size)]).encode('utf-8'))
+    for row in rows:
+        fields = {key: value for key, value in row.items() if key != 'image'}
+        digest.update(json.dumps(fields, sort_keys=True, default=str).encode('utf-8'))
+        image = row.get('image')
+        if isinstance(image, dict):
+            image = image.get('bytes') or image.get('path')
+        if isinstance(image, (bytes, bytearray)):
+            digest.update(hashlib.blake2b(image, digest_size=16).digest())
+        elif image is not None:
+            digest.update(str(image).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def process_chunk(
+    rows: List[Dict[str, Any]],
+    start: int,
+    thumbnail_size: Tuple[int, int]
+) -> List[Dict[str, Any]]:
+    """Normalize a chunk of rows and render their thumbnails (runs in a worker process)"""
+    items = []
+    for offset, row in enumerate(rows):
+        item = normalize_row(row, start + offset)
+        try:
+            item['thumbnail'] = make_thumbnail(row.get('image'), thumbnail_size)
+        except Exception as e:
+            print(f"Error processing image data for {item['id']}: {e}")
+            item['thumbnail'] = None
+        items.append(item)
+    return items
+
+
+class ChunkStore:
+    """Work directory of finished chunks plus a manifest of their fingerprints"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        os.makedirs(directory, exist_ok=True)
+        self.manifest: Dict[str, Any] = {'chunks': {}}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+    def path(self, index: int) -> str:
+        return os.path.join(self.directory, f'chunk-{index:05d}.json')
+
+    def is_current(self, index: int, digest: str) -> bool:
+        entry = self.manifest['chunks'].get(str(index))
+        return entry is not None and entry['fingerprint'] == digest and os.path.exists(self.path(index))
+
+    def save(self, index: int, digest: str, items: List[Dict[str, Any]]):
+        _write_json(self.path(index), items)
+        self.manifest['chunks'][str(index)] = {'fingerprint': digest, 'rows': len(items)}
+        _write_json(self.manifest_path, self.manifest)
+
+    def load(self, index: int) -> List[Dict[str, Any]]:
+        with open(self.path(index)) as f:
+            return json.load(f)
+
+    def prune(self, num_chunks: int):
+        """Forget chunks beyond the end of a dataset that shrank"""
+        for key in [key for key in self.manifest['chunks'] if int(key) >= num_chunks]:
+            del self.manifest['chunks'][key]
+            if os.path.exists(self.path(int(key))):
+                os.remove(self.path(int(key)))
+        _write_json(self.manifest_path, self.manifest)
+
+
+def _write_json(path: str, data: Any):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_source(args: argparse.Namespace):
+    """The rows to ingest: a JSONL file or the Hugging Face dataset"""
+    if args.jsonl:
+        with open(args.jsonl) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    from datasets import Image, load_dataset
+    dataset = load_dataset(args.dataset, split=args.split)
+    if 'image' in dataset.column_names:
+        # Ship encoded bytes to the workers instead of decoded PIL images
+        dataset = dataset.cast_column('image', Image(decode=False))
+    return dataset
+
+
+def iter_chunks(source, chunk_size: int) -> Iterator[Tuple[int, int, List[Dict[str, Any]]]]:
+    for index, start in enumerate(range(0, len(source), chunk_size)):
+        stop = min(start + chunk_size, len(source))
+        if isinstance(source, list):
+            rows = source[start:stop]
+        else:
+            columns = source[start:stop]
+            rows = [{name: values[i] for name, values in columns.items()} for i in range(stop - start)]
+        yield index, start, rows
+
+
+def ingest(args: argparse.Namespace) -> Catalog:
+    """Run the chunked ingestion and assemble the resulting catalog"""
+    thumbnail_size = (args.thumbnail_size, args.thumbnail_size)
+    store = ChunkStore(args.work_dir or f'{args.output}.chunks')
+    source = load_source(args)
+    if args.limit:
+        source = source[:args.limit] if isinstance(source, list) else source.select(range(min(args.limit, len(source))))
+    num_chunks = max(1, math.ceil(len(source) / args.chunk_size))
+    store.prune(num_chunks)
+    print(f"Ingesting {len(source)} rows in {num_chunks} chunks with {args.workers} workers")
+
+    start_time = time.perf_counter()
+    done_rows = skipped = 0
+    pending = {}
+
+    def finish(future_index: int):
+        nonlocal done_rows
+        future, digest = pending.pop(future_index)
+        items = future.result()
+        store.save(future_index, digest, items)
+        done_rows += len(items)
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"  chunk {future_index + 1}/{num_chunks}: {len(items)} rows "
+            f"({done_rows / elapsed:.0f} rows/s, {len(store.manifest['chunks'])}/{num_chunks} chunks ready)"
+        )
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for index, start, rows in iter_chunks(source, args.chunk_size):
+            digest = fingerprint(rows, thumbnail_size)
+            if store.is_current(index, digest):
+                skipped += 1
+                continue
+            pending[index] = (executor.submit(process_chunk, rows, start, thumbnail_size), digest)
+            # Keep a bounded number of chunks in flight
+            while len(pending) >= 2 * args.workers:
+                finish(min(pending))
+        while pending:
+            finish(min(pending))
+
+    if skipped:
+        print(f"  reused {skipped} unchanged chunks")
+
+    items = [item for index in range(num_chunks) for item in store.load(index)]
+    catalog = Catalog.from_rows(items, compact=True)
+    catalog.thumbnails = StringColumn(*StringColumn.encode([item['thumbnail'] for item in items]))
+    catalog.thumbnail_size = thumbnail_size
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Polyvore into a ready-to-serve catalog snapshot")
+    parser.add_argument('output', help="Snapshot file to write")
+    parser.add_argument('--dataset', default='Marqo/polyvore')
+    parser.add_argument('--split', default='data')
+    parser.add_argument('--jsonl', help="Ingest rows from a JSON-lines file instead of the dataset")
+    parser.add_argument('--work-dir', help="Directory for resumable chunks (default: OUTPUT.chunks)")
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--thumbnail-size', type=int, default=256, help="Thumbnail bounding box in pixels")
+    parser.add_argument('--limit', type=int, help="Only ingest the first N rows")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    catalog = ingest(args)
+    size = write_snapshot(args.output, catalog)
+    print(
+        f"Wrote {len(catalog)} items, {len(catalog.categories)} categories, {len(catalog.tags)} tags "
+        f"({size} bytes) to {args.output} in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == '__main__':
+    main()
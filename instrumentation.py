@@ -0,0 +1,183 @@
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Upper bounds of the histogram buckets, in seconds for stage timers
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            running += count
+            cumulative[bound] = running
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class _Stage:
+    """Context manager timing one stage into its histogram"""
+
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics: 'Instrumentation', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe_stage(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.count('errors', stage=self.name)
+        return False
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrumentation:
+    """Stage timers, counters and histograms for the recommender
+
+    Disabled instances return a shared no-op context from stage() and return
+    immediately from count(), observe() and observe_stage(), so leaving the
+    calls in hot paths costs one attribute check. Enable with enabled=True or
+    by setting the WARDROBE_METRICS environment variable.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._counters: Dict[Tuple[str, Optional[str]], float] = {}
+        self._stages: Dict[str, Histogram] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str):
+        """Time the enclosed block as stage name"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def count(self, name: str, value: float = 1, stage: str = None):
+        if not self.enabled:
+            return
+        key = (name, stage)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = COUNT_BUCKETS):
+        """Record value in the histogram name, created with buckets on first use"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_stage(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = Histogram(SECONDS_BUCKETS)
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._stages.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Point-in-time copy of every metric as plain dicts"""
+        with self._lock:
+            by_name: Dict[str, Dict[Optional[str], float]] = {}
+            for (name, stage), value in self._counters.items():
+                by_name.setdefault(name, {})[stage] = value
+            # Counters recorded only without a stage stay plain numbers; once a
+            # name has stages, its unlabeled value is kept under the '' stage
+            counters = {}
+            for name, stages in by_name.items():
+                if list(stages) == [None]:
+                    counters[name] = stages[None]
+                else:
+                    counters[name] = {'' if stage is None else stage: value for stage, value in stages.items()}
+            return {
+                'enabled': self.enabled,
+                'stages': {name: histogram.snapshot() for name, histogram in self._stages.items()},
+                'counters': counters,
+                'histograms': {name: histogram.snapshot() for name, histogram in self._histograms.items()}
+            }
+
+    def to_prometheus(self, prefix: str = 'wardrobe') -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram_lines(metric: str, data: Dict[str, Any], labels: str = ''):
+            for bound, count in data['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                separator = ',' if labels else ''
+                lines.append(f'{metric}_bucket{{{labels}{separator}le="{le}"}} {count}')
+            suffix = f'{{{labels}}}' if labels else ''
+            lines.append(f'{metric}_sum{suffix} {data["sum"]}')
+            lines.append(f'{metric}_count{suffix} {data["count"]}')
+
+        if snapshot['stages']:
+            metric = f'{prefix}_stage_seconds'
+            lines.append(f'# TYPE {metric} histogram')
+            for stage, data in sorted(snapshot['stages'].items()):
+                histogram_lines(metric, data, f'stage="{stage}"')
+
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f'{prefix}_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            if isinstance(value, dict):
+                for stage, stage_value in sorted(value.items()):
+                    labels = f'{{stage="{stage}"}}' if stage else ''
+                    lines.append(f'{metric}{labels} {stage_value}')
+            else:
+                lines.append(f'{metric} {value}')
+
+        for name, data in sorted(snapshot['histograms'].items()):
+            metric = f'{prefix}_{name}'
+            lines.append(f'# TYPE {metric} histogram')
+            histogram_lines(metric, data)
+
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide instance shared by every recommender
+metrics = Instrumentation(enabled=bool(os.environ.get('WARDROBE_METRICS')))
@@ -0,0 +1,125 @@
+import math
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from catalog import Catalog
+
+
+class PriceIndex:
+    """Item positions of each category sorted by price
+
+    "Which items of a category cost at most x" is a bisect into the sorted
+    prices, and the cheapest complete outfit is the sum of the first entry of
+    each category, so budgets nothing can fit are rejected before any
+    candidate filtering or composition. Unpriced and removed items (priced at
+    inf) are left out.
+    """
+
+    def __init__(self, positions: Dict[str, np.ndarray], prices: Dict[str, np.ndarray]):
+        self.positions = positions
+        self.prices = prices
+
+    @classmethod
+    def from_catalog(cls, catalog: Catalog) -> 'PriceIndex':
+        order = np.lexsort((catalog.price, catalog.category))
+        codes, sorted_prices = catalog.category[order], catalog.price[order]
+        bounds = np.searchsorted(codes, np.arange(len(catalog.categories) + 1))
+        positions, prices = {}, {}
+        for code, category in enumerate(catalog.categories):
+            start, end = int(bounds[code]), int(bounds[code + 1])
+            end = start + int(np.searchsorted(sorted_prices[start:end], np.inf))
+            positions[category] = order[start:end]
+            prices[category] = sorted_prices[start:end]
+        return cls(positions, prices)
+
+    @classmethod
+    def from_items(cls, categories: Sequence[str], prices: Sequence[Optional[float]]) -> 'PriceIndex':
+        """Index plain lists; positions are indices into them"""
+        category_array = np.asarray(categories, dtype=object)
+        price_array = np.array([np.inf if price is None else price for price in prices], dtype=np.float64)
+        positions, sorted_prices = {}, {}
+        for category in set(categories):
+            members = np.flatnonzero((category_array == category) & np.isfinite(price_array))
+            members = members[np.argsort(price_array[members], kind='stable')]
+            positions[category] = members
+            sorted_prices[category] = price_array[members]
+        return cls(positions, sorted_prices)
+
+    def cheapest(self, category: str) -> float:
+        prices = self.prices.get(category)
+        return float(prices[0]) if prices is not None and len(prices) else float('inf')
+
+    def count_at_most(self, category: str, limit: float) -> int:
+        prices = self.prices.get(category)
+        return 0 if prices is None else int(np.searchsorted(prices, limit, side='right'))
+
+    def at_most(self, category: str, limit: float) -> np.ndarray:
+        """Positions of the items of category priced at most limit, cheapest first"""
+        count = self.count_at_most(category, limit)
+        positions = self.positions.get(category)
+        return np.empty(0, dtype=np.int64) if positions is None else positions[:count]
+
+    def min_total(self, categories: Sequence[str]) -> float:
+        """Price of the cheapest outfit with one item of each category"""
+        return sum(self.cheapest(category) for category in categories)
+
+    def item_caps(self, categories: Sequence[str], budget: float, item_share: float = 1.0) -> List[float]:
+        """Highest price an item of each category can have and still be part of an outfit under budget
+
+        An item must leave room for the cheapest item of every other category,
+        and may not exceed item_share of the budget.
+        """
+        cheapest = [self.cheapest(category) for category in categories]
+        total = sum(cheapest)
+        return [min(budget * item_share, budget - (total - own)) for own in cheapest]
+
+    def feasible(self, categories: Sequence[str], budget: float, item_share: float = 1.0) -> bool:
+        """Whether any outfit with one item of each category fits the budget"""
+        return all(
+            self.cheapest(category) <= cap
+            for category, cap in zip(categories, self.item_caps(categories, budget, item_share))
+        )
+
+
+def best_subset(
+    prices: Sequence[float],
+    budget: float,
+    values: Optional[Sequence[float]] = None,
+    max_cells: int = 4096
+) -> List[int]:
+    """Indices of the subset with the highest total value whose total price fits the budget
+
+    values default to the prices, i.e. the subset spending the most of the
+    budget. Solved as a 0/1 knapsack over the budget split into at most
+    max_cells steps (cents when the budget allows). Prices are rounded up to
+    whole steps, so the result always fits; it can only fall short of the
+    optimum by less than one step per item of the optimal subset.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    values = prices if values is None else np.asarray(values, dtype=np.float64)
+    if budget < 0 or not len(prices):
+        return []
+    step = max(0.01, budget / max_cells)
+    capacity = int(math.floor(budget / step + 1e-6))
+    weights = np.ceil(prices / step - 1e-6).astype(np.int64)
+
+    # Free items with positive value are always worth taking
+    chosen = [int(i) for i in np.flatnonzero((weights <= 0) & (prices >= 0) & (values > 0))]
+    usable = np.flatnonzero((weights > 0) & (weights <= capacity) & (values > 0))
+
+    best = np.full(capacity + 1, -np.inf)
+    best[0] = 0.0
+    taken = np.zeros((len(usable), capacity + 1), dtype=bool)
+    for row, i in enumerate(usable):
+        weight = weights[i]
+        candidate = best[:-weight] + values[i]
+        improves = candidate > best[weight:]
+        taken[row, weight:] = improves
+        best[weight:] = np.where(improves, candidate, best[weight:])
+
+    cell = int(np.argmax(best))
+    for row in range(len(usable) - 1, -1, -1):
+        if taken[row, cell]:
+            chosen.append(int(usable[row]))
+            cell -= int(weights[usable[row]])
+    return sorted(chosen)
@@ -0,0 +1,42 @@
+import heapq
+import math
+import random
+from typing import Any, List, Optional
+
+
+class WeightedReservoir:
+    """Fixed-size weighted random sample of a stream (Efraimidis-Spirakis A-Res)
+
+    Each offered item gets the key u ** (1 / weight) for a uniform u, and the
+    size items with the largest keys are kept in a min-heap, so an item is
+    kept with probability proportional to its weight using O(size) memory
+    and one pass over the stream.
+    """
+
+    def __init__(self, size: int, rng: Optional[random.Random] = None):
+        self.size = size
+        self.rng = rng or random.Random()
+        self.seen = 0
+        self._heap: List[tuple] = []
+
+    def offer(self, item: Any, weight: float = 1.0) -> bool:
+        """Consider item for the sample; returns whether it was kept"""
+        self.seen += 1
+        if weight <= 0 or self.size <= 0:
+            return False
+        # Compare log keys, log(u) / weight, to avoid underflow for small weights
+        key = math.log(1.0 - self.rng.random()) / weight
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, (key, self.seen, item))
+            return True
+        if key > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (key, self.seen, item))
+            return True
+        return False
+
+    def items(self) -> List[Any]:
+        """The sampled items in the order they were offered"""
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: entry[1])]
+
+    def __len__(self) -> int:
+        return len(self._heap)
@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class CacheEntry:
+    """Cached result of one normalized request"""
+    catalog_version: int
+    expires_at: float
+    groups: List[Any]  # scored candidate pool per outfit category
+    outfits: Optional[List[List[int]]]  # catalog positions of each outfit, None until first composed
+
+
+class RecommendationCache:
+    """Bounded LRU + TTL cache of recommendation results keyed by normalized request
+
+    Entries hold candidate positions, prices and scores and the composed
+    outfits' catalog positions, never built outfits or images, so their size
+    does not depend on thumbnails.
+
+    Preference lists are sorted so equivalent sidebar inputs share an entry.
+    Budgets are part of the key as given: outfits are composed for the exact
+    budget of the request, never for a lower one. Entries remember the
+    catalog version they were built from and are dropped once the catalog
+    moves on.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, CacheEntry]' = OrderedDict()
+        self._catalog_version = None
+        self._lock = threading.Lock()
+
+    def make_key(
+        self,
+        occasion: str,
+        budget: float,
+        preferences: Optional[Dict[str, Any]],
+        num_recommendations: int,
+        style_profile: Optional[np.ndarray] = None
+    ) -> tuple:
+        preferences = preferences or {}
+        profile_digest = None
+        if style_profile is not None:
+            profile = np.ascontiguousarray(style_profile, dtype=np.float32)
+            profile_digest = hashlib.blake2b(profile.tobytes(), digest_size=16).hexdigest()
+        return (
+            occasion,
+            float(budget),
+            tuple(sorted(preferences.get('colors') or [])),
+            tuple(sorted(preferences.get('styles') or [])),
+            num_recommendations,
+            profile_digest
+        )
+
+    def get(self, key: Hashable, catalog_version: int) -> Optional[CacheEntry]:
+        with self._lock:
+            self._check_version(catalog_version)
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        key: Hashable,
+        catalog_version: int,
+        groups: List[Any],
+        outfits: Optional[List[List[int]]] = None
+    ) -> CacheEntry:
+        entry = CacheEntry(catalog_version, self.clock() + self.ttl_seconds, groups, outfits)
+        with self._lock:
+            self._check_version(catalog_version)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _check_version(self, catalog_version: int):
+        """Drop everything cached for an older catalog version"""
+        if catalog_version != self._catalog_version:
+            self._entries.clear()
+            self._catalog_version = catalog_version
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,283 @@
+"""Standalone asyncio HTTP service for outfit recommendations
+
+    POST /recommendations   JSON get_outfit_recommendations arguments
+    GET  /healthz           liveness
+    GET  /readyz            503 until the catalog is loaded
+    GET  /metrics           Prometheus text metrics (set WARDROBE_METRICS=1)
+
+Concurrent requests are gathered into micro-batches for at most
+--batch-window-ms and served by get_outfit_recommendations_batch on a thread
+pool that shares one loaded recommender. When more than --max-queue requests
+are waiting, new ones are rejected with 503 and a Retry-After header.
+
+Run with:
+
+    python service.py --port 8080 --snapshot catalog.snap
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from embeddings import EMBEDDING_DIM
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_RECOMMENDATIONS = 50
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'
+}
+
+
+class MicroBatcher:
+    """Collects concurrent requests into small batches for the recommender"""
+
+    def __init__(
+        self,
+        executor: ThreadPoolExecutor,
+        workers: int,
+        max_batch_size: int = 32,
+        batch_window: float = 0.005,
+        max_queue: int = 1024
+    ):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.recommender = None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.in_flight = asyncio.Semaphore(workers)
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, request: Dict[str, Any]) -> 'asyncio.Future':
+        """Queue a request; raises asyncio.QueueFull when the service is saturated"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((request, future))
+        return future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Never run more batches at once than there are workers
+            await self.in_flight.acquire()
+            loop.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple[Dict[str, Any], 'asyncio.Future']]):
+        loop = asyncio.get_running_loop()
+        try:
+            requests = [request for request, _ in batch]
+            response = await loop.run_in_executor(
+                self.executor, self.recommender.get_outfit_recommendations_batch, requests
+            )
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), result in zip(batch, response['results']):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.in_flight.release()
+
+
+class RecommendationService:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.executor = ThreadPoolExecutor(max_workers=args.workers)
+        self.batcher: Optional[MicroBatcher] = None
+        self.ready = False
+        self.started_at = time.time()
+
+    def load_recommender(self):
+        """Load the shared recommender, from a snapshot when one is configured"""
+        from WardrobeRecommender import WardrobeRecommender, get_shared_recommender
+        if self.args.snapshot:
+            return WardrobeRecommender.from_snapshot(self.args.snapshot)
+        return get_shared_recommender()
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.batcher = MicroBatcher(
+            self.executor,
+            workers=self.args.workers,
+            max_batch_size=self.args.max_batch_size,
+            batch_window=self.args.batch_window_ms / 1000.0,
+            max_queue=self.args.max_queue
+        )
+        server = await asyncio.start_server(self.handle_connection, self.args.host, self.args.port)
+        print(f"Serving recommendations on http://{self.args.host}:{self.args.port}")
+
+        self.batcher.recommender = await loop.run_in_executor(self.executor, self.load_recommender)
+        self.ready = True
+        print("Recommender loaded, service is ready")
+
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.batcher.run())
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra_headers = await self.route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self.write_response(writer, status, payload, extra_headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError as e:
+            self.write_response(writer, 400, {'error': str(e)}, {}, False)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader: asyncio.StreamReader):
+        """Parse one HTTP/1.1 request; returns None when the client closed the connection"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ValueError("malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), path.split('?', 1)[0], headers, body
+
+    async def route(self, method: str, path: str, body: bytes):
+        if path == '/healthz':
+            return 200, {'status': 'ok', 'uptime_seconds': time.time() - self.started_at}, {}
+        if path == '/readyz':
+            if not self.ready:
+                return 503, {'status': 'loading'}, {}
+            return 200, {
+                'status': 'ready',
+                'catalog_version': self.batcher.recommender.catalog_version,
+                'queued': self.batcher.queue.qsize(),
+                'batches': self.batcher.batches,
+                'requests': self.batcher.requests
+            }, {}
+        if path == '/metrics':
+            from instrumentation import metrics
+            return 200, metrics.to_prometheus(), {'Content-Type': 'text/plain; version=0.0.4'}
+        if path != '/recommendations':
+            return 404, {'error': 'not found'}, {}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}, {'Allow': 'POST'}
+        if not self.ready:
+            return 503, {'error': 'recommender is loading'}, {'Retry-After': '1'}
+
+        try:
+            request = parse_recommendation_request(json.loads(body or b'{}'))
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': f'invalid request: {e}'}, {}
+        try:
+            future = self.batcher.submit(request)
+        except asyncio.QueueFull:
+            return 503, {'error': 'overloaded'}, {'Retry-After': '1'}
+        try:
+            recommendations = await future
+        except Exception as e:
+            return 500, {'error': str(e)}, {}
+        return 200, {'recommendations': recommendations}, {}
+
+    @staticmethod
+    def write_response(
+        writer: asyncio.StreamWriter,
+        status: int,
+        payload: Union[Dict[str, Any], str],
+        extra_headers: Dict[str, str],
+        keep_alive: bool
+    ):
+        # Plain-text payloads (metrics) are sent as is, everything else as JSON
+        body = (payload if isinstance(payload, str) else json.dumps(payload)).encode('utf-8')
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+            **extra_headers
+        }
+        head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+
+
+def parse_recommendation_request(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a JSON request body into get_outfit_recommendations_batch form"""
+    if not isinstance(data, dict):
+        raise ValueError("body must be a JSON object")
+    preferences = data.get('preferences') or {}
+    if not isinstance(preferences, dict):
+        raise ValueError("preferences must be an object")
+    style_profile = data.get('style_profile')
+    if style_profile is not None:
+        style_profile = np.asarray(style_profile, dtype=np.float32)
+        if style_profile.shape != (EMBEDDING_DIM,) or not np.isfinite(style_profile).all():
+            raise ValueError(f"style_profile must be a list of {EMBEDDING_DIM} finite numbers")
+    budget = float(data['budget'])
+    if not math.isfinite(budget) or budget <= 0:
+        raise ValueError("budget must be a positive number")
+    num_recommendations = int(data.get('num_recommendations', 3))
+    if not 1 <= num_recommendations <= MAX_RECOMMENDATIONS:
+        raise ValueError(f"num_recommendations must be between 1 and {MAX_RECOMMENDATIONS}")
+    return {
+        'style_profile': style_profile,
+        'occasion': str(data['occasion']),
+        'budget': budget,
+        'preferences': {
+            'colors': [str(color) for color in preferences.get('colors') or []],
+            'styles': [str(style) for style in preferences.get('styles') or []]
+        },
+        'num_recommendations': num_recommendations
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve outfit recommendations over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--snapshot', help="Catalog snapshot to serve instead of loading the dataset")
+    parser.add_argument('--workers', type=int, default=4, help="Batches run concurrently")
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--batch-window-ms', type=float, default=5.0)
+    parser.add_argument('--max-queue', type=int, default=1024, help="Queued requests before rejecting")
+    args = parser.parse_args()
+    try:
+        asyncio.run(RecommendationService(args).start())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Sharded candidate filtering on a process pool over shared memory
+
+The catalog columns used for filtering (price, color, style-tag bitmask and
+the item embeddings) are copied once into multiprocessing shared memory.
+Items are grouped into shards by category, and large categories are split
+further so every worker gets a share. Each worker attaches to the segments
+by name on first use and keeps them mapped, so a task ships only its shard
+bounds and the request; the worker filters its shard, keeps the best-scoring
+and cheapest matches, and the parent merges the partial results per category.
+
+With workers <= 1 the same shard function runs in-process over the ordinary
+arrays and no shared memory or pool is used.
+"""
+import math
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Executor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MIN_SHARD_SIZE = 4096
+# Shared-memory layouts a worker keeps attached (older catalog versions are dropped)
+MAX_ATTACHED = 4
+
+
+class SharedArrays:
+    """NumPy arrays copied into named shared-memory segments
+
+    Only the workers map the segments as arrays; this process writes them once
+    and keeps reading its own copies. The segments are unlinked when this
+    object is closed or garbage collected, and processes that still have them
+    mapped keep working until they detach.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.segments: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, str, Tuple[int, ...]]] = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            segment = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            _view(segment, array.dtype, array.shape)[...] = array
+            self.segments.append(segment)
+            self.spec[name] = (segment.name, array.dtype.str, array.shape)
+        self._finalizer = weakref.finalize(self, _release, self.segments)
+
+    def close(self):
+        self._finalizer()
+
+
+def _view(segment: shared_memory.SharedMemory, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+    # frombuffer holds an export on the segment's buffer, so the mapping cannot
+    # be closed underneath a live view
+    count = int(np.prod(shape, dtype=np.int64))
+    return np.frombuffer(segment.buf, dtype=dtype, count=count).reshape(shape)
+
+
+def _release(segments: List[shared_memory.SharedMemory]):
+    for segment in segments:
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# Worker-side cache of attached layouts, keyed by their segment names
+_attached: 'OrderedDict[tuple, Tuple[list, Dict[str, np.ndarray]]]' = OrderedDict()
+
+
+def attach(spec: Dict[str, Tuple[str, str, Tuple[int, ...]]]) -> Dict[str, np.ndarray]:
+    """Map the segments described by spec, reusing them across tasks"""
+    key = tuple(segment_name for segment_name, _, _ in spec.values())
+    entry = _attached.get(key)
+    if entry is None:
+        segments, arrays = [], {}
+        for name, (segment_name, dtype, shape) in spec.items():
+            # Pool workers share the parent's resource tracker, which unlinks
+            # the segments only if the parent never does
+            segment = shared_memory.SharedMemory(name=segment_name)
+            segments.append(segment)
+            arrays[name] = _view(segment, np.dtype(dtype), shape)
+        entry = _attached[key] = (segments, arrays)
+        while len(_attached) > MAX_ATTACHED:
+            _attached.popitem(last=False)
+    else:
+        _attached.move_to_end(key)
+    return entry[1]
+
+
+def filter_shard(
+    arrays: Dict[str, np.ndarray],
+    start: int,
+    end: int,
+    request: Dict[str, Any]
+) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]:
+    """Matching items of one shard as (positions, prices, scores)
+
+    Applies the price cap, occasion tags and color/style preferences, then
+    keeps at most request['keep'] best-scoring plus request['keep'] cheapest
+    matches. Without a query, scores are None and a random keep-sized sample
+    stands in for the best-scoring items.
+    """
+    positions = arrays['positions'][start:end]
+    prices = arrays['price'][positions]
+    mask = prices <= request['max_price']
+    positions, prices = positions[mask], prices[mask]
+
+    for key in ('occasion', 'styles'):
+        tag_query = request.get(key)
+        if tag_query is not None and len(positions):
+            mask = (arrays['style_mask'][positions] & tag_query).any(axis=1)
+            positions, prices = positions[mask], prices[mask]
+    colors = request.get('colors')
+    if colors is not None and len(positions):
+        mask = np.isin(arrays['color'][positions], colors)
+        positions, prices = positions[mask], prices[mask]
+
+    keep = request['keep']
+    query = request.get('query')
+    scores = None
+    if query is not None:
+        scores = arrays['embeddings'][positions] @ query
+    if len(positions) <= keep:
+        return positions, prices, scores
+
+    cheapest = np.argpartition(prices, keep)[:keep]
+    if scores is not None:
+        best = np.argpartition(scores, -keep)[-keep:]
+    else:
+        best = np.random.default_rng(request.get('seed')).choice(len(positions), keep, replace=False)
+    kept = np.union1d(best, cheapest)
+    return positions[kept], prices[kept], None if scores is None else scores[kept]
+
+
+def _run_shard(spec, start: int, end: int, request: Dict[str, Any]):
+    return filter_shard(attach(spec), start, end, request)
+
+
+class ShardedFilter:
+    """Candidate filtering for one catalog version, fanned out over shards
+
+    Shards are contiguous ranges of a category-sorted position array, at most
+    shard_size items each. executor is a process pool shared across catalog
+    versions; when it is None the shards are filtered in this process.
+    """
+
+    def __init__(
+        self,
+        catalog,
+        embeddings: Optional[np.ndarray],
+        executor: Optional[Executor] = None,
+        workers: int = 1,
+        shard_size: Optional[int] = None
+    ):
+        self.catalog = catalog
+        self.executor = executor
+        order = np.argsort(catalog.category, kind='stable').astype(np.int64)
+        bounds = np.searchsorted(catalog.category[order], np.arange(len(catalog.categories) + 1))
+        if shard_size is None:
+            shard_size = max(MIN_SHARD_SIZE, math.ceil(len(catalog) / max(1, 2 * workers)))
+
+        self.shards: Dict[str, List[Tuple[int, int]]] = {}
+        for code, category in enumerate(catalog.categories):
+            start, end = int(bounds[code]), int(bounds[code + 1])
+            self.shards[category] = [
+                (begin, min(begin + shard_size, end)) for begin in range(start, end, shard_size)
+            ]
+
+        arrays = {
+            'positions': order,
+            'price': catalog.price,
+            'color': catalog.color,
+            'style_mask': catalog.style_mask
+        }
+        if embeddings is not None:
+            arrays['embeddings'] = embeddings
+        self.arrays = arrays
+        self.shared = None if executor is None else SharedArrays(arrays)
+
+    @property
+    def embeddings(self) -> Optional[np.ndarray]:
+        return self.arrays.get('embeddings')
+
+    def filter(
+        self,
+        categories: List[str],
+        max_price: float,
+        occasion_styles: Optional[List[str]],
+        preferences: Optional[Dict[str, Any]],
+        query: Optional[np.ndarray] = None,
+        keep: int = 512
+    ) -> List[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+        """Merged (positions, prices, scores) of the matching items of each category"""
+        catalog = self.catalog
+        preferences = preferences or {}
+        request = {
+            'max_price': max_price,
+            'occasion': None if occasion_styles is None else catalog.tag_query(occasion_styles),
+            'styles': catalog.tag_query(preferences['styles']) if preferences.get('styles') else None,
+            'colors': np.asarray(
+                [code for code in map(catalog.colors.code, preferences['colors']) if code >= 0], dtype=np.int32
+            ) if preferences.get('colors') else None,
+            'query': query,
+            'keep': keep
+        }
+        if query is not None and self.embeddings is None:
+            raise ValueError("sharded filter was built without embeddings")
+
+        tasks = [
+            (category, start, end)
+            for category in categories
+            for start, end in self.shards.get(category, [])
+        ]
+        if self.executor is None:
+            parts = [filter_shard(self.arrays, start, end, request) for _, start, end in tasks]
+        else:
+            futures = [self.executor.submit(_run_shard, self.shared.spec, start, end, request) for _, start, end in tasks]
+            parts = [future.result() for future in futures]
+
+        merged = []
+        for category in categories:
+            pieces = [part for (task_category, _, _), part in zip(tasks, parts) if task_category == category]
+            if not pieces:
+                empty = np.empty(0, dtype=np.int64)
+                merged.append((empty, np.empty(0), None if query is None else np.empty(0, dtype=np.float32)))
+                continue
+            merged.append((
+                np.concatenate([positions for positions, _, _ in pieces]),
+                np.concatenate([prices for _, prices, _ in pieces]),
+                None if query is None else np.concatenate([scores for _, _, scores in pieces])
+            ))
+        return merged
+
+    def close(self):
+        if self.shared is not None:
+            self.shared.close()
@@ -0,0 +1,226 @@
+"""Memory-mapped catalog snapshots
+
+A snapshot holds the catalog columns, interned string tables and bitmap index
+in one file that is opened with mmap; every array is a zero-copy view into the
+mapping, so opening is independent of catalog size and worker processes
+opening the same file share its physical pages.
+
+File layout (little endian):
+
+    header   magic, format version, TOC length, data length, CRC32 of TOC+data
+    TOC      JSON describing the arrays, string tables and bitmaps
+    data     64-byte aligned array payloads
+
+Write a snapshot with:
+
+    python snapshot.py write catalog.snap
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+from typing import Dict, Any, Optional, Tuple
+
+from catalog import Catalog, StringColumn, StringTable
+from bitmap_index import Bitmap, BitmapIndex
+
+MAGIC = b'WRSNAP\x00\x01'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIQQI')
+ALIGNMENT = 64
+
+TEXT_COLUMNS = ('ids', 'names', 'descriptions', 'purchase_links', 'image_urls')
+NUMERIC_COLUMNS = ('price', 'category', 'color', 'style_mask')
+
+
+class SnapshotError(ValueError):
+    """Raised when a snapshot file is malformed, corrupt or of an unknown version"""
+
+
+def write_snapshot(path: str, catalog: Catalog, index: Optional[BitmapIndex] = None) -> int:
+    """Write catalog (and its bitmap index) to path atomically; returns bytes written"""
+    if catalog.removed is not None and catalog.removed.any():
+        # Leave items removed by incremental updates out of the file
+        catalog = catalog.take(np.flatnonzero(~catalog.removed))
+        catalog.removed = None
+        index = None
+    if index is None:
+        index = BitmapIndex.from_catalog(catalog)
+
+    arrays: Dict[str, np.ndarray] = {
+        name: np.ascontiguousarray(getattr(catalog, name)) for name in NUMERIC_COLUMNS
+    }
+    text_columns = TEXT_COLUMNS + (('thumbnails',) if catalog.thumbnails is not None else ())
+    for name in text_columns:
+        offsets, data, valid = StringColumn.encode(list(getattr(catalog, name)))
+        arrays[f'{name}.offsets'] = offsets
+        arrays[f'{name}.data'] = data
+        arrays[f'{name}.valid'] = valid
+
+    # All sparse bitmaps share one positions array and all dense ones one words array
+    bitmaps, positions, words = [], [], []
+    positions_len = words_len = 0
+    for (kind, value), bitmap in index.bitmaps.items():
+        if bitmap.is_dense:
+            bitmaps.append([kind, value, True, words_len, len(bitmap.words)])
+            words.append(bitmap.words)
+            words_len += len(bitmap.words)
+        else:
+            bitmaps.append([kind, value, False, positions_len, len(bitmap.positions)])
+            positions.append(bitmap.positions)
+            positions_len += len(bitmap.positions)
+    arrays['bitmaps.positions'] = np.concatenate(positions or [np.empty(0)]).astype(np.int32)
+    arrays['bitmaps.words'] = np.concatenate(words or [np.empty(0)]).astype(np.uint64)
+
+    toc: Dict[str, Any] = {
+        'num_items': len(catalog),
+        'tables': {
+            'categories': catalog.categories.values,
+            'colors': catalog.colors.values,
+            'tags': catalog.tags.values
+        },
+        'bitmaps': bitmaps,
+        'thumbnail_size': list(catalog.thumbnail_size) if catalog.thumbnails is not None else None,
+        'arrays': {}
+    }
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        toc['arrays'][name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset
+        }
+        offset += array.nbytes
+    data_length = offset
+
+    toc_bytes = json.dumps(toc, separators=(',', ':')).encode('utf-8')
+    data_start = _align(HEADER.size + len(toc_bytes))
+    checksum = zlib.crc32(toc_bytes)
+    payload = bytearray(data_length)
+    for name, array in arrays.items():
+        start = toc['arrays'][name]['offset']
+        payload[start:start + array.nbytes] = array.tobytes()
+    checksum = zlib.crc32(payload, checksum)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(toc_bytes), data_length, checksum))
+        f.write(toc_bytes)
+        f.write(b'\0' * (data_start - HEADER.size - len(toc_bytes)))
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return data_start + data_length
+
+
+def read_snapshot(path: str, verify: bool = False) -> Tuple[Catalog, BitmapIndex]:
+    """Open a snapshot as a catalog and bitmap index backed by a read-only mmap
+
+    The header and TOC are always checked, including that every array lies
+    inside the data region. verify also checks the CRC32 of the whole data
+    region, which reads every page of the file, so serving loads leave it
+    off to keep opening lazy; snapshot.py info verifies.
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buffer) < HEADER.size:
+        raise SnapshotError(f"{path}: file too short for a snapshot header")
+    magic, version, toc_length, data_length, checksum = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path}: not a catalog snapshot")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"{path}: unsupported snapshot version {version}")
+    data_start = _align(HEADER.size + toc_length)
+    if len(buffer) < data_start + data_length:
+        raise SnapshotError(f"{path}: truncated snapshot")
+
+    toc_bytes = buffer[HEADER.size:HEADER.size + toc_length]
+    if verify:
+        actual = zlib.crc32(toc_bytes)
+        actual = zlib.crc32(memoryview(buffer)[data_start:data_start + data_length], actual)
+        if actual != checksum:
+            raise SnapshotError(f"{path}: checksum mismatch")
+    toc = json.loads(toc_bytes)
+    for name, spec in toc['arrays'].items():
+        nbytes = int(np.prod(spec['shape'], dtype=np.int64)) * np.dtype(spec['dtype']).itemsize
+        if spec['offset'] < 0 or spec['offset'] + nbytes > data_length:
+            raise SnapshotError(f"{path}: array {name} lies outside the data region")
+
+    def array(name: str) -> np.ndarray:
+        spec = toc['arrays'][name]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        return np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec['offset']
+        ).reshape(spec['shape'])
+
+    text = {
+        name: StringColumn(array(f'{name}.offsets'), array(f'{name}.data'), array(f'{name}.valid'))
+        for name in TEXT_COLUMNS
+    }
+    if 'thumbnails.offsets' in toc['arrays']:
+        text['thumbnails'] = StringColumn(
+            array('thumbnails.offsets'), array('thumbnails.data'), array('thumbnails.valid')
+        )
+    catalog = Catalog(
+        price=array('price'),
+        category=array('category'),
+        color=array('color'),
+        style_mask=array('style_mask'),
+        categories=StringTable(toc['tables']['categories']),
+        colors=StringTable(toc['tables']['colors']),
+        tags=StringTable(toc['tables']['tags']),
+        thumbnail_size=toc.get('thumbnail_size'),
+        **text
+    )
+    # Keep the mapping alive for as long as the catalog's views are
+    catalog.buffer = buffer
+
+    size = toc['num_items']
+    positions, words = array('bitmaps.positions'), array('bitmaps.words')
+    index = BitmapIndex(size, {
+        (kind, value): (
+            Bitmap(size, words=words[start:start + length]) if dense
+            else Bitmap(size, positions=positions[start:start + length])
+        )
+        for kind, value, dense, start, length in toc['bitmaps']
+    })
+    return catalog, index
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write or inspect catalog snapshots")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    write_parser = subparsers.add_parser('write', help="Load the catalog and write a snapshot")
+    write_parser.add_argument('path', help="Output snapshot file")
+    info_parser = subparsers.add_parser('info', help="Verify a snapshot and print its summary")
+    info_parser.add_argument('path', help="Snapshot file")
+    args = parser.parse_args()
+
+    if args.command == 'write':
+        from WardrobeRecommender import WardrobeRecommender
+        recommender = WardrobeRecommender()
+        catalog, index = recommender.catalog, recommender.index
+        if catalog is None:
+            print("Dataset unavailable, writing the sample catalog instead")
+            catalog, index = recommender.sample_catalog, recommender.sample_index
+        size = write_snapshot(args.path, catalog, index)
+        print(f"Wrote {len(catalog)} items ({size} bytes) to {args.path}")
+    else:
+        catalog, index = read_snapshot(args.path, verify=True)
+        print(
+            f"{args.path}: {len(catalog)} items, {len(catalog.categories)} categories, "
+            f"{len(catalog.colors)} colors, {len(catalog.tags)} tags, {len(index.bitmaps)} bitmaps"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Style profiles extracted from a user's photo on the CPU
+
+The photo is shrunk to a small analysis image, and its pixels, weighted
+toward the center where the person usually is, are assigned to the nearest
+of a palette of named catalog colors. The resulting color histogram, its
+dominant colors, and a few texture and tone statistics (edge density,
+saturation, brightness) are turned into weighted color and style-tag tokens
+and hashed into the same space as the item embeddings, so the profile can be
+passed as style_profile to the recommender like any other vector.
+
+Profiles and the display thumbnail are cached by a hash of the uploaded
+bytes, so reruns with the same photo skip decoding entirely.
+"""
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embeddings import COLOR_WEIGHT, EMBEDDING_DIM, TAG_WEIGHT, color_token, embed_tokens, tag_token
+
+# Named colors of the catalog vocabulary as RGB
+PALETTE: Dict[str, Tuple[int, int, int]] = {
+    'Black': (20, 20, 20), 'White': (245, 245, 245), 'Gray': (128, 128, 128), 'Navy': (30, 40, 80),
+    'Blue': (50, 100, 200), 'Red': (200, 30, 40), 'Burgundy': (110, 20, 40), 'Pink': (240, 150, 180),
+    'Purple': (120, 60, 150), 'Green': (50, 140, 70), 'Yellow': (240, 210, 60), 'Orange': (240, 130, 40),
+    'Brown': (110, 70, 40), 'Beige': (220, 200, 170), 'Khaki': (180, 160, 110), 'Gold': (200, 160, 60)
+}
+ANALYSIS_SIZE = (64, 64)
+THUMBNAIL_SIZE = (150, 150)
+DOMINANT_COLORS = 3
+# Colors covering less of the photo than this are left out of the profile
+MIN_COLOR_SHARE = 0.05
+CACHE_SIZE = 64
+
+
+@dataclass
+class PhotoProfile:
+    """What a photo says about its owner's style"""
+    vector: np.ndarray                 # unit-length embedding for style_profile
+    colors: List[Tuple[str, float]]    # dominant named colors with their share of the photo
+    styles: Dict[str, float]           # style tags implied by texture and tone, 0-1
+    thumbnail: str                     # base64 PNG for display
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _center_weights(height: int, width: int) -> np.ndarray:
+    """Gaussian pixel weights peaking at the image center"""
+    ys = (np.arange(height) - (height - 1) / 2) / (height / 2)
+    xs = (np.arange(width) - (width - 1) / 2) / (width / 2)
+    weights = np.exp(-(ys[:, None] ** 2 + xs[None, :] ** 2))
+    return weights / weights.sum()
+
+
+def color_histogram(pixels: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted share of (h, w, 3) RGB pixels nearest each PALETTE color"""
+    palette = np.array(list(PALETTE.values()), dtype=np.float32)
+    flat = pixels.reshape(-1, 3).astype(np.float32)
+    distances = ((flat[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+    return np.bincount(distances.argmin(axis=1), weights=weights.ravel(), minlength=len(palette))
+
+
+def texture_features(pixels: np.ndarray, weights: np.ndarray) -> Tuple[float, float, float]:
+    """(edge density, saturation, brightness) of (h, w, 3) RGB pixels, each 0-1"""
+    rgb = pixels.astype(np.float32) / 255
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    gradient = np.zeros_like(gray)
+    gradient[:, 1:] += np.abs(np.diff(gray, axis=1))
+    gradient[1:, :] += np.abs(np.diff(gray, axis=0))
+    high, low = rgb.max(axis=2), rgb.min(axis=2)
+    saturation = np.where(high > 0, (high - low) / np.maximum(high, 1e-6), 0)
+    edges = float(np.clip((gradient * weights).sum() * 4, 0, 1))
+    return edges, float((saturation * weights).sum()), float((high * weights).sum())
+
+
+def style_weights(edges: float, saturation: float, brightness: float) -> Dict[str, float]:
+    """Style tags suggested by how busy, colorful and dark a photo is"""
+    muted, dark, smooth = 1 - saturation, 1 - brightness, 1 - edges
+    return {
+        'Bold': saturation * edges,
+        'Trendy': saturation * brightness,
+        'Streetwear': edges * muted,
+        'Formal': dark * muted * smooth,
+        'Elegant': dark * smooth,
+        'Classic': muted * smooth,
+        'Casual': brightness * muted,
+        'Comfortable': brightness * smooth * muted
+    }
+
+
+def _thumbnail(image) -> str:
+    from PIL import Image
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.LANCZOS)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def extract_profile(data: bytes, dim: int = EMBEDDING_DIM) -> PhotoProfile:
+    """Analyze raw image bytes into a PhotoProfile"""
+    # Pillow is only needed once a photo is actually uploaded
+    from PIL import Image, ImageOps
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert('RGB')
+    pixels = np.asarray(image.resize(ANALYSIS_SIZE, Image.BILINEAR))
+    weights = _center_weights(*pixels.shape[:2])
+
+    histogram = color_histogram(pixels, weights)
+    names = list(PALETTE)
+    colors = [
+        (names[code], float(histogram[code]))
+        for code in np.argsort(-histogram, kind='stable')[:DOMINANT_COLORS]
+        if histogram[code] >= MIN_COLOR_SHARE
+    ]
+    styles = style_weights(*texture_features(pixels, weights))
+
+    vector = embed_tokens(
+        [(color_token(name), COLOR_WEIGHT * share) for name, share in colors]
+        + [(tag_token(tag), TAG_WEIGHT * weight) for tag, weight in styles.items()],
+        dim
+    )
+    return PhotoProfile(vector, colors, styles, _thumbnail(image))
+
+
+_profiles: 'OrderedDict[str, PhotoProfile]' = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def profile_from_upload(data: bytes) -> Optional[PhotoProfile]:
+    """Cached PhotoProfile of uploaded bytes, or None if they are not a readable image"""
+    key = content_hash(data)
+    with _profiles_lock:
+        profile = _profiles.get(key)
+        if profile is not None:
+            _profiles.move_to_end(key)
+            return profile
+    try:
+        profile = extract_profile(data)
+    except Exception as e:
+        print(f"Could not extract a style profile: {e}")
+        return None
+    with _profiles_lock:
+        _profiles[key] = profile
+        while len(_profiles) > CACHE_SIZE:
+            _profiles.popitem(last=False)
+    return profile